@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# OpenCV is imported where it is used, so apps only pay for loading it once
+# the camera is switched on.
+
+# --- Config ---
+SAMPLE_FPS = 6           # decode at most this many frames per second
+MOTION_THRESHOLD = 4.0   # mean abs pixel change (0-255) on the thumbnail
+RESCAN_SECONDS = 1.0     # re-decode a still scene this often anyway
+DEDUP_TTL = 5.0          # the same code within this window is one read
+WORKERS = 2
+THUMB_WIDTH = 160
+
+
+class TTLCache:
+    def __init__(self, ttl=DEDUP_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        # True if `key` is new (or its previous read has expired)
+        now = self._clock()
+        with self._lock:
+            if len(self._seen) > 1024:
+                self._seen = {k: t for k, t in self._seen.items() if now - t < self.ttl}
+            last = self._seen.get(key)
+            self._seen[key] = now
+            return last is None or now - last >= self.ttl
+
+
+class BarcodeDecoder:
+    # QR codes and 1D barcodes (EAN/UPC/Code128...) via OpenCV. Detector
+    # objects aren't thread-safe, so each worker thread gets its own.
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _detectors(self):
+        detectors = getattr(self._local, "detectors", None)
+        if detectors is None:
+            import cv2
+            detectors = [cv2.QRCodeDetector()]
+            if hasattr(cv2, "barcode"):
+                detectors.append(cv2.barcode.BarcodeDetector())
+            self._local.detectors = detectors
+        return detectors
+
+    def decode(self, image):
+        import cv2
+
+        found = []
+        for detector in self._detectors():
+            try:
+                result = detector.detectAndDecodeMulti(image)
+            except cv2.error:
+                continue
+            # (retval, decoded_info, ...) for both detectors
+            if result and result[0]:
+                found.extend(text.strip() for text in result[1] if text and text.strip())
+        return list(dict.fromkeys(found))
+
+
+def _thumbnail(frame):
+    import cv2
+
+    height, width = frame.shape[:2]
+    scale = THUMB_WIDTH / float(width)
+    small = cv2.resize(frame, (THUMB_WIDTH, max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return small
+
+
+class ScanPipeline:
+    # submit() runs on the media thread and must stay cheap: it only decides
+    # whether a frame is worth decoding (rate limit + motion gate on a small
+    # grey thumbnail) and hands it to a worker pool. New codes are collected
+    # for the script thread to poll().
+
+    def __init__(self, decoder=None, sample_fps=SAMPLE_FPS, motion_threshold=MOTION_THRESHOLD,
+                 rescan_seconds=RESCAN_SECONDS, dedup_ttl=DEDUP_TTL, workers=WORKERS, clock=time.monotonic):
+        self.decoder = decoder or BarcodeDecoder()
+        self.min_interval = 1.0 / sample_fps
+        self.motion_threshold = motion_threshold
+        self.rescan_seconds = rescan_seconds
+        self.frames_seen = 0
+        self.frames_decoded = 0
+        self._clock = clock
+        self._dedup = TTLCache(dedup_ttl, clock)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="barcode")
+        self._slots = threading.Semaphore(workers)
+        self._results = deque(maxlen=100)
+        self._last_submit = float("-inf")
+        self._last_thumb = None
+
+    def _should_decode(self, frame, now):
+        if now - self._last_submit < self.min_interval:
+            return False
+        import cv2
+
+        thumb = _thumbnail(frame)
+        changed = (
+            self._last_thumb is None
+            or thumb.shape != self._last_thumb.shape
+            or cv2.absdiff(thumb, self._last_thumb).mean() >= self.motion_threshold
+        )
+        if not changed and now - self._last_submit < self.rescan_seconds:
+            return False
+        self._last_thumb = thumb
+        return True
+
+    def submit(self, frame, block=False):
+        self.frames_seen += 1
+        now = self._clock()
+        if not self._should_decode(frame, now):
+            return False
+        # Live streams never queue up behind slow decodes; the frame is dropped
+        if not self._slots.acquire(blocking=block):
+            return False
+        self._last_submit = now
+        self.frames_decoded += 1
+        future = self._pool.submit(self._decode, frame.copy())
+        future.add_done_callback(lambda _: self._slots.release())
+        return True
+
+    def _decode(self, frame):
+        for code in self.decoder.decode(frame):
+            if self._dedup.add(code):
+                self._results.append(code)
+
+    def has_results(self):
+        return bool(self._results)
+
+    def poll(self):
+        codes = []
+        while self._results:
+            codes.append(self._results.popleft())
+        return codes
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+# --- Offline use (recorded fixtures, no camera) ---
+def decode_image_file(path, decoder=None):
+    import cv2
+
+    image = cv2.imread(path)
+    if image is None:
+        raise ValueError(f"Could not read image: {path}")
+    return (decoder or BarcodeDecoder()).decode(image)
+
+
+def scan_video_file(path, pipeline=None):
+    # Feeds a recording through the same gating/dedup as the live stream,
+    # using the video's own timestamps, and returns the codes in read order.
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    position = [0.0]
+    pipeline = pipeline or ScanPipeline(clock=lambda: position[0])
+    codes = []
+    try:
+        index = 0
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            position[0] = index / fps
+            pipeline.submit(frame, block=True)
+            index += 1
+        pipeline.close()
+        codes.extend(pipeline.poll())
+    finally:
+        capture.release()
+    return codes
@@ -0,0 +1,83 @@
+"""Benchmark the fuzzy serial index: build time and lookup latency.
+
+Runs on a synthetic inventory of prefixed serials (half sequential, half
+random alphanumeric) with typo'd queries.
+
+    python bench_fuzzy.py --rows 1000000 --queries 500
+"""
+import argparse
+import random
+import statistics
+import string
+import time
+
+from fuzzy_match import FuzzyIndex, bounded_distance
+
+
+ALNUM = string.ascii_uppercase + string.digits
+
+
+def make_serials(rows, rng):
+    prefixes = ["SN", "MC", "PX", "TRK"]
+    serials = []
+    for i in range(rows):
+        if i % 2:
+            serials.append(f"{rng.choice(prefixes)}{i:07d}")
+        else:
+            serials.append(rng.choice(prefixes) + "".join(rng.choice(ALNUM) for _ in range(8)))
+    return serials
+
+
+def typo(serial, rng, edits):
+    chars = list(serial)
+    for _ in range(edits):
+        op = rng.choice("sid")
+        pos = rng.randrange(len(chars))
+        if op == "s":
+            chars[pos] = rng.choice("0123456789OISB")
+        elif op == "i":
+            chars.insert(pos, rng.choice("0123456789"))
+        elif len(chars) > 1:
+            del chars[pos]
+    return "".join(chars)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--distance", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    serials = make_serials(args.rows, rng)
+
+    start = time.perf_counter()
+    index = FuzzyIndex(serials, max_distance=args.distance)
+    build = time.perf_counter() - start
+
+    timings, found = [], 0
+    for _ in range(args.queries):
+        target = rng.choice(serials)
+        query = typo(target, rng, rng.randint(1, args.distance))
+        start = time.perf_counter()
+        matches = index.search(query)
+        timings.append((time.perf_counter() - start) * 1000)
+        # Hit if the best match is at least as close as the serial we typo'd
+        # (dense sequential serials often have other keys just as close)
+        best = matches[0][1] if matches else args.distance + 1
+        found += best <= bounded_distance(query.upper(), target, args.distance)
+
+    timings.sort()
+    print(f"rows:        {args.rows}")
+    print(f"build:       {build:.2f} s")
+    print(f"lookup p50:  {statistics.median(timings):.2f} ms")
+    print(f"lookup p95:  {timings[int(len(timings) * 0.95) - 1]:.2f} ms")
+    print(f"lookup max:  {timings[-1]:.2f} ms")
+    print(f"hits:        {found}/{args.queries}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import excel_cache
+import shared_store
+from edit_journal import WorkingCopy
+from excel_export import build_final_excel, row_status, write_highlighted_excel
+from search_index import contains_match, exact_match, fuzzy_match
+from table_view import PAGE_SIZE, styled
+
+# Headless benchmark of the stages every inventory app runs through (load,
+# search, confirm/add, styling, FINAL export) on seeded synthetic
+# inventories. Results go to JSON; --baseline compares against an earlier run.
+#
+#   python bench_inventory.py --rows 1000 10000 100000 --output bench.json
+#   python bench_inventory.py --baseline bench.json
+#   python bench_inventory.py --rows 1000000 --data-dir fixtures   # keep the xlsx/csv
+
+# --- Config ---
+DEFAULT_ROWS = [1000, 10000, 100000]
+DUPLICATE_RATE = 0.01   # share of rows reusing another row's serial
+NOISE_SECONDS = 0.001   # smaller differences are never reported as regressions
+TEMPLATE_ROWS = 1000    # rows in the blank stock-take template fixture
+
+PREFIXES = np.array(["SN", "MC", "PX", "TRK"])
+PRODUCTS = np.array(["Widget", "Pump", "Drill", "Compressor", "Generator", "Forklift", "Lathe", "Welder"])
+STATUSES = np.array(["Pending", "Confirmed", "In Use", "Retired"])
+ALNUM = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"))
+
+
+# --- Synthetic inventories ---
+def make_serials(rows, rng):
+    # Half sequential (SN0000123), half random alphanumeric (PX7K2QZ9A1)
+    prefixes = PREFIXES[rng.integers(0, len(PREFIXES), rows)]
+    sequential = np.char.zfill(np.arange(rows).astype(str), 7)
+    random_part = ["".join(chars) for chars in ALNUM[rng.integers(0, len(ALNUM), (rows, 8))]]
+    body = np.where(np.arange(rows) % 2 == 1, sequential, np.array(random_part))
+    return np.char.add(prefixes, body)
+
+
+def make_inventory(rows, seed=0, duplicate_rate=DUPLICATE_RATE):
+    rng = np.random.default_rng(seed)
+    serials = make_serials(rows, rng)
+    duplicates = rng.random(rows) < duplicate_rate
+    serials[duplicates] = serials[rng.integers(0, rows, duplicates.sum())]
+
+    names = np.char.add(np.char.add(PRODUCTS[rng.integers(0, len(PRODUCTS), rows)], " "),
+                        rng.integers(100, 1000, rows).astype(str))
+    names = names.astype(object)
+    names[rng.random(rows) < 0.02] = None  # blank cells, as real sheets have
+
+    marks = rng.random(rows)
+    remarks = np.where(marks < 0.2, "Confirmed", np.where(marks > 0.99, "New entry added", ""))
+    confirmed = np.where(marks < 0.2, "Y", np.where(marks > 0.99, "B", ""))
+
+    return pd.DataFrame({
+        "Serial Number": serials,
+        "Product Name": names,
+        "Quantity": rng.integers(1, 500, rows),
+        "Status": STATUSES[rng.choice(len(STATUSES), rows, p=[0.6, 0.2, 0.15, 0.05])],
+        "REMARKS": remarks,
+        "confirmed": confirmed,
+    })
+
+
+def make_queries(df, count, seed=0):
+    rng = np.random.default_rng(seed + 1)
+    serials = df["Serial Number"].to_numpy()[rng.integers(0, len(df), count)]
+    exact = [str(s) for s in serials]
+    contains = [s[len(s) // 2 - 2:len(s) // 2 + 3] for s in exact]
+    # One substituted character: the typo case the fuzzy index exists for
+    fuzzy = [s[:-2] + ("0" if s[-2] != "0" else "1") + s[-1] for s in exact]
+    return exact, contains, fuzzy
+
+
+def write_fixtures(df, directory, name):
+    os.makedirs(directory, exist_ok=True)
+    xlsx_path = os.path.join(directory, f"{name}.xlsx")
+    csv_path = os.path.join(directory, f"{name}.csv")
+    write_highlighted_excel(xlsx_path, df, sheet_name="Sheet1")
+    df.to_csv(csv_path, index=False)
+    return xlsx_path, csv_path
+
+
+# --- Timing ---
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def per_call(fn, args):
+    # Median seconds per call over a list of inputs
+    times = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def run_size(rows, seed, queries, repeat, data_dir):
+    results = {}
+    inventory = make_inventory(rows, seed)
+    xlsx_path, csv_path = write_fixtures(inventory, data_dir, f"inventory_{rows}_{seed}")
+    exact, contains, fuzzy = make_queries(inventory, queries, seed)
+
+    # Load: cold parse, then the cached path every rerun takes
+    def load_cold():
+        excel_cache.clear_cache(disk=True)
+        excel_cache.load_inventory(xlsx_path)
+
+    results["load_xlsx_cold"] = best_of(load_cold, repeat)
+    results["load_xlsx_cached"] = best_of(lambda: excel_cache.load_inventory(xlsx_path), repeat)
+    results["load_csv"] = best_of(lambda: pd.read_csv(csv_path), repeat)
+    df = excel_cache.load_inventory(xlsx_path)
+
+    # Search: first call builds the column index, later calls are lookups
+    for stage, match, values in (("exact", exact_match, exact), ("contains", contains_match, contains),
+                                 ("fuzzy", fuzzy_match, fuzzy)):
+        start = time.perf_counter()
+        match(df, "Serial Number", values[0])
+        results[f"search_{stage}_build"] = time.perf_counter() - start
+        results[f"search_{stage}_query"] = per_call(lambda v: match(df, "Serial Number", v), values)
+
+    # Mutation: confirms and adds as the apps do them, and through the journal
+    work = df.copy()
+
+    def confirm(value):
+        work.loc[exact_match(work, "Serial Number", value), "confirmed"] = "Y"
+
+    results["confirm"] = per_call(confirm, exact)
+    new_row = {col: "" for col in work.columns}
+
+    def add(i):
+        work.loc[len(work)] = {**new_row, "Serial Number": f"NEW{i:06d}", "REMARKS": "New entry added"}
+
+    results["add_row"] = per_call(add, range(min(queries, 50)))
+
+    # A fresh stock-take template: REMARKS/confirmed present but blank, which
+    # Excel hands back as all-NaN columns
+    template_path = os.path.join(data_dir, f"template_{rows}_{seed}.xlsx")
+    write_highlighted_excel(template_path, inventory.head(TEMPLATE_ROWS).assign(REMARKS=None, confirmed=None),
+                            sheet_name="Sheet1")
+    template = excel_cache.load_inventory(template_path).copy()
+
+    def confirm_template(label):
+        template.loc[[label], "REMARKS"] = "Confirmed"
+        template.loc[[label], "confirmed"] = "Y"
+
+    results["confirm_template"] = per_call(confirm_template, template.index[:min(queries, 50)])
+
+    with tempfile.TemporaryDirectory() as journal_dir:
+        start = time.perf_counter()
+        wc = WorkingCopy(df, f"bench-{rows}", journal_dir=journal_dir)
+        results["journal_open"] = time.perf_counter() - start
+        labels = df.index[np.random.default_rng(seed).integers(0, len(df), queries)]
+        results["journal_edit"] = per_call(lambda label: wc.set_cell(label, "Status", "Checked"), labels)
+        wc.close()
+
+    # Styling: colour status for the whole frame, html for one page
+    green = df["confirmed"] == "Y"
+    blue = df["confirmed"] == "B"
+
+    def style_page():
+        status = row_status(df, green, blue)
+        styled(df.iloc[:PAGE_SIZE], status[:PAGE_SIZE]).to_html()
+
+    results["style_page"] = best_of(style_page, repeat)
+
+    # FINAL export with green/blue rows and a scattering of edited cells
+    red = {(label, "Status"): True for label in df.index[::97]}
+    results["export_final"] = best_of(lambda: build_final_excel(df, green=green, blue=blue, red_cells=red), repeat)
+    return results
+
+
+# --- Reporting ---
+def compare(results, baseline, tolerance):
+    # [(rows, stage, old, new, ratio)] for stages slower than baseline by more than tolerance
+    regressions = []
+    for rows, stages in results["results"].items():
+        old_stages = baseline.get("results", {}).get(rows, {})
+        for stage, new in stages.items():
+            old = old_stages.get(stage)
+            if old is None:
+                continue
+            ratio = new / old if old else float("inf")
+            marker = ""
+            if ratio > 1 + tolerance and new - old > NOISE_SECONDS:
+                regressions.append((rows, stage, old, new, ratio))
+                marker = "  <-- regression"
+            print(f"{rows:>8} {stage:<24} {old * 1000:>10.2f} ms -> {new * 1000:>10.2f} ms  x{ratio:.2f}{marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark inventory load/search/style/export stages.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging (0.25 = 25%%)")
+    parser.add_argument("--data-dir", help="keep the generated xlsx/csv here (default: a temp dir)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the disk cache out of the real one
+        excel_cache.CACHE_DIR = os.path.join(tmp, "cache")
+        shared_store.STORE_DIR = os.path.join(tmp, "store")
+        data_dir = args.data_dir or os.path.join(tmp, "data")
+        results = {
+            "meta": {
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+                "seed": args.seed,
+                "queries": args.queries,
+                "repeat": args.repeat,
+            },
+            "results": {},
+        }
+        for rows in args.rows:
+            stages = run_size(rows, args.seed, args.queries, args.repeat, data_dir)
+            results["results"][str(rows)] = stages
+            for stage, seconds in stages.items():
+                print(f"{rows:>8} {stage:<24} {seconds * 1000:>10.2f} ms")
+        excel_cache.clear_cache()
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.baseline}:")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} stage(s) slower than baseline by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+# Cold-start check for the apps: imports each app's top-level modules in a
+# fresh interpreter (as a new Streamlit worker would), reports the slowest
+# imports, and exits 1 if startup is over budget or pulls in a subsystem
+# that should only load on first use (camera, Excel styling, Sheets).
+#
+#   python bench_startup.py
+#   python bench_startup.py test_poop.py test_9.py --budget-ms 300
+
+# --- Config ---
+DEFAULT_APPS = ["test_poop.py"]
+BUDGET_MS = 500           # imports on top of the host (streamlit), best of --repeat runs
+HOST_MODULES = ("streamlit",)   # loaded before the clock starts; every app pays for these anyway
+LAZY_MODULES = ("cv2", "streamlit_webrtc", "aiortc", "av", "openpyxl", "gspread", "oauth2client")
+TOP_IMPORTS = 8
+
+_CHILD = """
+import json, sys, time
+for name in {host!r}:
+    try:
+        __import__(name)
+    except ImportError:
+        pass
+before = set(sys.modules)
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": sorted(set(sys.modules) - before)}}))
+"""
+
+
+def top_level_imports(path):
+    # Modules an app imports unconditionally at module level, in order
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return [m for m in dict.fromkeys(modules) if m.split(".")[0] not in HOST_MODULES]
+
+
+def _import_times(stderr, loaded):
+    # (cumulative seconds, module) for the outermost imports in -X importtime output
+    times = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if name.startswith("  ") or name.strip() not in loaded:
+            continue  # nested import, or part of the host
+        try:
+            times.append((int(cumulative) / 1e6, name.strip()))
+        except ValueError:
+            continue  # header line
+    return sorted(times, reverse=True)
+
+
+def measure(modules, cwd):
+    code = _CHILD.format(host=HOST_MODULES, modules=modules)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd, capture_output=True,
+                          text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["imports"] = _import_times(proc.stderr, set(result["loaded"]))
+    return result
+
+
+def check_app(path, repeat, cwd):
+    modules = top_level_imports(path)
+    runs = [measure(modules, cwd) for _ in range(repeat)]
+    best = min(runs, key=lambda r: r["seconds"])
+    loaded = {name.split(".")[0] for name in best["loaded"]}
+    return {"app": path, "modules": modules, "seconds": best["seconds"], "imports": best["imports"],
+            "loaded": sorted(loaded), "lazy": sorted(loaded & set(LAZY_MODULES))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the apps' import time against a budget.")
+    parser.add_argument("apps", nargs="*", default=DEFAULT_APPS)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    failed = False
+    for app in args.apps:
+        try:
+            result = check_app(os.path.join(cwd, app), args.repeat, cwd)
+        except RuntimeError as e:
+            print(f"{app}: import failed: {e}")
+            failed = True
+            continue
+        ms = result["seconds"] * 1000
+        over = ms > args.budget_ms
+        print(f"{app}: {ms:.0f} ms of imports (budget {args.budget_ms:.0f} ms){'  <-- over budget' if over else ''}")
+        for seconds, name in result["imports"][:TOP_IMPORTS]:
+            print(f"    {seconds * 1000:>8.1f} ms  {name}")
+        if result["lazy"]:
+            print(f"    loaded at startup, should load on first use: {', '.join(result['lazy'])}")
+        failed = failed or over or bool(result["lazy"])
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
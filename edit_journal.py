@@ -0,0 +1,385 @@
+import json
+import os
+import pickle
+import time
+import uuid
+import weakref
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from integrity_index import IntegrityIndex
+from inventory_summary import CONFIRMED, MARK_COLUMN, NEW, REMARKS_COLUMN, InventorySummary, frame_marks, row_mark
+from profiling import traced
+
+# --- Config ---
+JOURNAL_DIR = os.environ.get("EDIT_JOURNAL_DIR", ".edit_journal")
+SNAPSHOT_EVERY = 200   # journal entries between snapshots
+MAX_UNDO = 500
+
+NEW_REMARK = "New entry added"
+
+
+def _plain(value):
+    # Cell values as something json can write (numpy scalars, timestamps...)
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _with_categories(s, values):
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        missing = [v for v in dict.fromkeys(values) if not pd.isna(v) and v not in s.cat.categories]
+        if missing:
+            s = s.cat.add_categories(missing)
+    return s
+
+
+def _with_values(s, values):
+    # Copy of column `s` with {row: value} written in; the column becomes
+    # object only if a value doesn't fit its dtype (text typed into Quantity)
+    rows, new = list(values), list(values.values())
+    s = _with_categories(s, new).copy()
+    try:
+        s.loc[rows] = new
+    except (TypeError, ValueError):
+        s = s.astype(object)
+        s.loc[rows] = new
+    return s
+
+
+class WorkingCopy:
+    # The uploaded frame plus every change made to it since. The frame itself
+    # is the shared, read-only copy every session has (see shared_store); a
+    # session only keeps its own changes: edited cells, added rows and the
+    # confirmed/new/edited marks. `df` lays them over the shared frame.
+    #
+    # Each edit/confirm/add is appended to a journal file (one json line,
+    # fsynced), so a rerun only costs the new operation and a crashed or
+    # restarted session picks up where it left off. Every SNAPSHOT_EVERY
+    # entries the changes are pickled and the journal starts over, which
+    # keeps replay short.
+    #
+    # Undo/redo are journal entries too: undo reverts the last operation
+    # and moves it onto the redo stack; any new operation clears that stack.
+    #
+    # The journal belongs to one `session` (the app keeps its id across
+    # reloads), so two people working on the same workbook never replay or
+    # truncate each other's changes.
+
+    @traced("journal.open")
+    def __init__(self, base, digest, session=None, journal_dir=JOURNAL_DIR, snapshot_every=SNAPSHOT_EVERY):
+        self.digest = digest
+        self.session = session or uuid.uuid4().hex
+        self.snapshot_every = snapshot_every
+        self.journal_path = os.path.join(journal_dir, f"{digest}-{self.session}.jsonl")
+        self.snapshot_path = os.path.join(journal_dir, f"{digest}-{self.session}.snapshot.pkl")
+        # Composed frames are keyed by this working copy, not just the upload:
+        # other sessions' frames of the same workbook hold other edits
+        self._frame_key = f"{digest}-{uuid.uuid4().hex}"
+        self.version = 0
+        self.base = base          # shared; never written to
+        self.cells = {}           # (row, column) -> value, edits to base rows
+        self.added = {}           # row -> {column: value}, in the order added
+        self.confirmed = set()    # row labels, green in the export
+        self.new_rows = set()     # row labels, blue in the export
+        self.edited = {}          # (row, column) -> True, red in the export
+        self._frame = None        # (version, weakref to the composed df)
+        self._undo = []
+        self._redo = []
+        self._entries = 0
+        # Counts and Quantity totals, updated per operation from here on
+        self.summary = InventorySummary(base)
+        # Serial duplicates/blanks, likewise; check confirms and adds against it
+        self.integrity = IntegrityIndex(base)
+
+        os.makedirs(journal_dir, exist_ok=True)
+        self._recover()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._touch()
+
+    # --- Recovery ---
+    def _recover(self):
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "rb") as f:
+                state = pickle.load(f)
+            if "df" in state:
+                # Snapshot from before the shared store: it holds the whole frame
+                old = state["df"]
+                state["cells"] = {
+                    (row, col): _plain(old.at[row, col]) for row, col in state["edited"] if row in self.base.index
+                }
+                state["added"] = {
+                    row: {col: _plain(v) for col, v in old.loc[row].items()}
+                    for row in old.index.difference(self.base.index)
+                }
+            self.cells = state["cells"]
+            self.added = state["added"]
+            self.confirmed = state["confirmed"]
+            self.new_rows = state["new_rows"]
+            self.edited = state["edited"]
+            self._undo = state["undo"]
+            self._redo = state["redo"]
+            self.version = state["version"]
+            # The summary starts from the snapshot's state, in one vectorized pass
+            df = self._compose()
+            history = self.summary.history
+            self.summary = InventorySummary(df, self._marks(df))
+            self.summary.history = state.get("history", history)
+            self.integrity = IntegrityIndex(df)
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash mid-write
+                self._replay(entry)
+                self._entries += 1
+
+    def _replay(self, entry):
+        if entry["op"] == "undo":
+            self._pop_undo()
+        elif entry["op"] == "redo":
+            self._pop_redo()
+        else:
+            self._do(entry)
+        if "at" in entry:
+            self.summary.record(entry["at"])
+
+    # --- Journal ---
+    @traced("journal.write")
+    def _write(self, entry):
+        self._journal.write(json.dumps(entry) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._entries += 1
+        if self._entries >= self.snapshot_every:
+            self.snapshot()
+
+    def snapshot(self):
+        state = {
+            "cells": self.cells, "added": self.added, "confirmed": self.confirmed, "new_rows": self.new_rows,
+            "edited": self.edited, "undo": self._undo, "redo": self._redo, "version": self.version,
+            "history": self.summary.history,
+        }
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        # Everything up to here is in the snapshot
+        self._journal.seek(0)
+        self._journal.truncate()
+        self._entries = 0
+
+    def _touch(self):
+        self.version += 1
+
+    @property
+    def df(self):
+        # The base frame with this session's changes laid over it. Only the
+        # edited columns are copied (the rest are views of the shared frame),
+        # and the result is held weakly: it lives as long as the rerun using
+        # it, not as long as the session.
+        df = self._frame[1]() if self._frame is not None and self._frame[0] == self.version else None
+        if df is None:
+            df = self._compose()
+            self._frame = (self.version, weakref.ref(df))
+        return df
+
+    @traced("journal.compose")
+    def _compose(self):
+        df = self.base.copy(deep=False)
+        by_column = defaultdict(dict)
+        for (row, col), value in self.cells.items():
+            by_column[col][row] = value
+        for col, values in by_column.items():
+            df[col] = _with_values(df[col], values)
+        if self.added:
+            added = pd.DataFrame.from_dict(self.added, orient="index", columns=df.columns, dtype=object)
+            for col in df.columns:
+                # Added rows take the column's dtype where they fit, so the
+                # append doesn't turn whole columns into objects
+                df[col] = _with_categories(df[col], added[col])
+                try:
+                    added[col] = added[col].astype(df[col].dtype)
+                except (TypeError, ValueError):
+                    pass
+            df = pd.concat([df, added])
+        # New key for the search index cache whenever the data changes
+        df.attrs["digest"] = f"{self._frame_key}-v{self.version}"
+        return df
+
+    def _value(self, row, col):
+        if row in self.added:
+            return self.added[row].get(col)
+        if (row, col) in self.cells:
+            return self.cells[(row, col)]
+        return self.base.at[row, col]
+
+    def _marks(self, df):
+        # This session's marks over those the workbook was saved with
+        saved = frame_marks(df)
+        return np.where(df.index.isin(self.confirmed), CONFIRMED, np.where(df.index.isin(self.new_rows), NEW, saved))
+
+    def _summary_row(self, row):
+        # The row's part in the summary; None if there is no such row
+        if row is None or (row not in self.added and row not in self.base.index):
+            return None
+        status_column, quantity_column = self.summary.status_column, self.summary.quantity_column
+        mark = CONFIRMED if row in self.confirmed else NEW if row in self.new_rows else row_mark(
+            self._value(row, MARK_COLUMN) if MARK_COLUMN in self.base.columns else None,
+            self._value(row, REMARKS_COLUMN) if REMARKS_COLUMN in self.base.columns else None,
+        )
+        return self.summary.row(
+            mark,
+            self._value(row, status_column) if status_column in self.base.columns else None,
+            self._value(row, quantity_column) if quantity_column in self.base.columns else None,
+        )
+
+    def _track_key(self, op):
+        # Keep the integrity index in step when an op changes a row's serial
+        key_column = self.integrity.key_column
+        if not self.integrity.present or op["op"] == "confirm" or op.get("col", key_column) != key_column:
+            return
+        row = op["row"]
+        if row in self.added or row in self.base.index:
+            self.integrity.update(row, self._value(row, key_column))
+        else:
+            self.integrity.remove(row)
+
+    def _next_row(self):
+        last = max(self.added, default=-1)
+        if len(self.base):
+            last = max(last, int(self.base.index.max()))
+        return last + 1
+
+    # --- Operations ---
+    # Each operation records what it overwrote, so it can be undone without
+    # going back to the upload.
+    def _do(self, op):
+        before = self._summary_row(op.get("row"))
+        kind = op["op"]
+        if kind == "set":
+            row, col = op["row"], op["col"]
+            op.setdefault("old", _plain(self._value(row, col)))
+            op.setdefault("was_edited", (row, col) in self.edited)
+            self._set(row, col, op["value"])
+            self.edited[(row, col)] = True
+        elif kind == "confirm":
+            op.setdefault("was_confirmed", op["row"] in self.confirmed)
+            self.confirmed.add(op["row"])
+        elif kind == "add":
+            row = op.setdefault("row", self._next_row())
+            self.added[row] = dict(op["values"])
+            self.new_rows.add(row)
+        else:
+            raise ValueError(f"unknown operation: {kind}")
+        self.summary.replace(before, self._summary_row(op["row"]))
+        self._track_key(op)
+        self._undo.append(op)
+        del self._undo[:-MAX_UNDO]
+        self._touch()
+        return op
+
+    def _revert(self, op):
+        before = self._summary_row(op["row"])
+        kind = op["op"]
+        if kind == "set":
+            row, col = op["row"], op["col"]
+            if op["was_edited"] or row in self.added:
+                self._set(row, col, op["old"])
+            else:
+                self.cells.pop((row, col), None)  # back to the shared value
+            if not op["was_edited"]:
+                self.edited.pop((row, col), None)
+        elif kind == "confirm":
+            if not op["was_confirmed"]:
+                self.confirmed.discard(op["row"])
+        elif kind == "add":
+            self.added.pop(op["row"], None)
+            self.new_rows.discard(op["row"])
+        self.summary.replace(before, self._summary_row(op["row"]))
+        self._track_key(op)
+        self._touch()
+
+    def _set(self, row, col, value):
+        if row in self.added:
+            self.added[row][col] = value
+        else:
+            self.cells[(row, col)] = value
+
+    def _pop_undo(self):
+        if not self._undo:
+            return None
+        op = self._undo.pop()
+        self._revert(op)
+        self._redo.append(op)
+        return op
+
+    def _pop_redo(self):
+        if not self._redo:
+            return None
+        op = self._redo.pop()
+        redo = self._redo
+        self._do(op)
+        self._redo = redo
+        return op
+
+    def _apply(self, op):
+        self._redo = []
+        op["at"] = time.time()
+        op = self._do(op)
+        self.summary.record(op["at"])
+        self._write(op)
+        return op
+
+    def set_cell(self, row, col, value):
+        return self._apply({"op": "set", "row": _plain(row), "col": col, "value": value})
+
+    def confirm(self, row):
+        return self._apply({"op": "confirm", "row": _plain(row)})
+
+    def add_row(self, values):
+        values = {col: values.get(col, "") for col in self.base.columns}
+        if "REMARKS" in values:
+            values["REMARKS"] = NEW_REMARK
+        return self._apply({"op": "add", "values": values})["row"]
+
+    def undo(self):
+        op = self._pop_undo()
+        if op is not None:
+            entry = {"op": "undo", "at": time.time()}
+            self.summary.record(entry["at"])
+            self._write(entry)
+        return op
+
+    def redo(self):
+        op = self._pop_redo()
+        if op is not None:
+            entry = {"op": "redo", "at": time.time()}
+            self.summary.record(entry["at"])
+            self._write(entry)
+        return op
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def discard(self):
+        # Forget every change (journal and snapshot included)
+        self._journal.close()
+        for path in (self.journal_path, self.snapshot_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close(self):
+        self._journal.close()
@@ -0,0 +1,148 @@
+import hashlib
+import os
+from io import BytesIO
+
+import pandas as pd
+
+from inventory_dtypes import normalise_frame
+from profiling import traced
+from shared_store import clear_store, find_frame, prune_directory, shared_frame
+
+# --- Config ---
+# Parsed workbooks are keyed by the SHA-256 of the uploaded bytes, so the same
+# file uploaded again (in this rerun, a later rerun or another session) is only
+# parsed through openpyxl once. In memory, loaded frames live in the shared
+# store (shared_store, bounded by its MAX_IDLE_BYTES); on disk, parsed frames
+# are kept here up to MAX_DISK_BYTES, least recently used dropped first.
+CACHE_DIR = os.environ.get("INVENTORY_CACHE_DIR", ".inventory_cache")
+MAX_DISK_BYTES = int(os.environ.get("INVENTORY_CACHE_DISK_BYTES", 2 * 1024 * 1024 * 1024))
+CACHE_FORMAT = 2  # bump when the cached frames change shape (2: compact dtypes)
+
+
+def file_bytes(uploaded_file):
+    # Streamlit UploadedFile / BytesIO, raw bytes or a path on disk
+    if isinstance(uploaded_file, (bytes, bytearray)):
+        return bytes(uploaded_file)
+    if hasattr(uploaded_file, "getvalue"):
+        return uploaded_file.getvalue()
+    if hasattr(uploaded_file, "read"):
+        data = uploaded_file.read()
+        uploaded_file.seek(0)
+        return data
+    with open(uploaded_file, "rb") as f:
+        return f.read()
+
+
+def file_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _cache_key(digest, sheet_name):
+    return f"{digest}-{sheet_name}-v{CACHE_FORMAT}"
+
+
+def _disk_paths(key):
+    base = os.path.join(CACHE_DIR, key)
+    return f"{base}.parquet", f"{base}.pkl"
+
+
+def _disk_get(key):
+    for path in _disk_paths(key):
+        if not os.path.exists(path):
+            continue
+        try:
+            df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_pickle(path)
+        except Exception:
+            # Corrupt or unreadable copy: drop it and re-parse the workbook
+            os.remove(path)
+            continue
+        try:
+            os.utime(path)  # recently used: pruned last
+        except OSError:
+            pass
+        return df
+    return None
+
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _disk_put(key, df):
+    parquet_path, pickle_path = _disk_paths(key)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    try:
+        _write_atomic(parquet_path, lambda p: df.to_parquet(p, index=False))
+    except Exception:
+        # Arrow can't store object columns that mix numbers and text (e.g.
+        # serials like 10234 next to "SN001"); keep those frames as a pickle.
+        try:
+            _write_atomic(pickle_path, df.to_pickle)
+        except Exception:
+            pass
+    prune_directory(CACHE_DIR, MAX_DISK_BYTES, (".parquet", ".pkl"), keep=[parquet_path, pickle_path])
+
+
+@traced("read_excel")
+def parse_sheet(data, sheet_name=0):
+    df = pd.read_excel(BytesIO(data), sheet_name=sheet_name)
+    # Parquet only stores string headers; normalise them up front so a fresh
+    # parse and a disk hit hand back the same columns.
+    df.columns = [str(c) for c in df.columns]
+    return normalise_frame(df)
+
+
+@traced("load_inventory")
+def load_inventory(uploaded_file, sheet_name=0):
+    data = file_bytes(uploaded_file)
+    digest = file_digest(data)
+
+    def load():
+        key = _cache_key(digest, sheet_name)
+        df = _disk_get(key)
+        if df is None:
+            df = parse_sheet(data, sheet_name)
+            _disk_put(key, df)
+        return df
+
+    # Callers add rows and edit cells in place; the copy-on-write view keeps
+    # the shared frame pristine
+    df = shared_inventory(digest, sheet_name, load)
+    # The search index cache is keyed by this; other sheets of the same file
+    # need keys of their own
+    df.attrs["digest"] = digest if sheet_name == 0 else f"{digest}:{sheet_name}"
+    return df
+
+
+def cached_frame(digest, sheet_name=0):
+    # Cache lookup without parsing; None when the workbook hasn't been loaded
+    key = _cache_key(digest, sheet_name)
+    df = find_frame(key)
+    if df is None:
+        df = _disk_get(key)
+    return df
+
+
+def shared_inventory(digest, sheet_name, load):
+    # Process-wide copy of a loaded frame, handed out as a copy-on-write view
+    # (see shared_store); load() is only called the first time
+    return shared_frame(_cache_key(digest, sheet_name), load)
+
+
+def cache_frame(digest, df, sheet_name=0):
+    # For frames parsed outside load_inventory (e.g. the streaming ingest)
+    _disk_put(_cache_key(digest, sheet_name), df)
+
+
+def clear_cache(disk=False):
+    clear_store(disk)
+    if disk and os.path.isdir(CACHE_DIR):
+        for name in os.listdir(CACHE_DIR):
+            if name.endswith((".parquet", ".pkl")):
+                os.remove(os.path.join(CACHE_DIR, name))
@@ -0,0 +1,146 @@
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from profiling import traced
+
+# --- Highlight colours used in the FINAL sheet ---
+GREEN = '#C6EFCE'  # confirmed / matched
+BLUE = '#ADD8E6'   # new entry
+RED = '#FFC7CE'    # edited cell
+
+_NONE, _GREEN, _BLUE = 0, 1, 2
+
+# Sheets this big are written in xlsxwriter's constant_memory mode by default
+CONSTANT_MEMORY_ROWS = 100000
+PROGRESS_ROWS = 10000  # report progress every this many rows in constant_memory mode
+
+# Fill per row_status() value
+STATUS_FILLS = np.array(['', GREEN, BLUE], dtype=object)
+
+
+def _mask(df, rows):
+    if rows is None:
+        return np.zeros(len(df), dtype=bool)
+    if isinstance(rows, (pd.Series, np.ndarray)) and np.asarray(rows).dtype == bool:
+        return np.asarray(rows, dtype=bool)
+    return df.index.isin(list(rows))
+
+
+def row_status(df, green=None, blue=None):
+    # Green wins over blue, same as the old per-row if/elif
+    status = np.full(len(df), _NONE, dtype=np.int8)
+    status[_mask(df, blue)] = _BLUE
+    status[_mask(df, green)] = _GREEN
+    return status
+
+
+def runs(values):
+    # (start, end, value) for each run of equal values, end inclusive
+    values = np.asarray(values)
+    if len(values) == 0:
+        return []
+    breaks = np.flatnonzero(values[1:] != values[:-1]) + 1
+    starts = np.concatenate(([0], breaks))
+    ends = np.concatenate((breaks - 1, [len(values) - 1]))
+    return list(zip(starts.tolist(), ends.tolist(), values[starts].tolist()))
+
+
+def _red_runs(df, red_cells):
+    # Edited cells grouped into vertical runs per column
+    positions = {}
+    for label, col in red_cells:
+        if col not in df.columns or label not in df.index:
+            continue
+        positions.setdefault(df.columns.get_loc(col), []).append(df.index.get_loc(label))
+    for col_pos, rows in positions.items():
+        rows = np.unique(rows)
+        breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+        for block in np.split(rows, breaks):
+            yield int(block[0]), int(block[-1]), col_pos
+
+
+def _write_rows(worksheet, df, progress=None):
+    # constant_memory mode only keeps the current row in memory, so cells have
+    # to be written row by row (pandas' to_excel writes column by column).
+    worksheet.write_row(0, 0, [str(c) for c in df.columns])
+    values = df.astype(object).where(df.notna(), None)
+    for i, row in enumerate(values.itertuples(index=False, name=None), start=1):
+        worksheet.write_row(i, 0, row)
+        if progress is not None and i % PROGRESS_ROWS == 0:
+            progress(i / len(df))
+
+
+def _color(value):
+    value = str(value)
+    return value if value.startswith('#') else f'#{value}'
+
+
+def row_fills(n_rows, color_map):
+    # {row position: colour} -> per-row colour array ('' for no fill)
+    fills = np.full(n_rows, '', dtype=object)
+    for pos, color in color_map.items():
+        if color and 0 <= pos < n_rows:
+            fills[pos] = _color(color)
+    return fills
+
+
+def open_writer(target, constant_memory=False):
+    options = {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd hh:mm:ss'} if constant_memory else {}
+    return pd.ExcelWriter(target, engine='xlsxwriter', engine_kwargs={'options': options})
+
+
+def write_sheet(writer, df, fills=None, red_cells=None, sheet_name='Inventory', progress=None):
+    # One highlighted sheet into an open xlsxwriter writer (see open_writer).
+    # `progress(fraction)` is called as rows are written, if given.
+    constant_memory = writer.book.constant_memory
+    if constant_memory:
+        worksheet = writer.book.add_worksheet(sheet_name)
+        _write_rows(worksheet, df, progress)
+    else:
+        df.to_excel(writer, index=False, sheet_name=sheet_name)
+        worksheet = writer.sheets[sheet_name]
+    if progress is not None:
+        progress(1.0)
+    workbook = writer.book
+
+    last_col = max(len(df.columns) - 1, 0)
+    always = {'type': 'formula', 'criteria': 'TRUE'}
+
+    # Edited cells go first so they take priority over the row colour
+    if red_cells:
+        red_fmt = workbook.add_format({'bg_color': RED})
+        for first, last, col in _red_runs(df, red_cells):
+            worksheet.conditional_format(first + 1, col, last + 1, col, {**always, 'format': red_fmt})
+
+    # One range per run of same-coloured rows (+1 to skip header)
+    if fills is not None:
+        formats = {}
+        for first, last, color in runs(fills):
+            if not color:
+                continue
+            if color not in formats:
+                formats[color] = workbook.add_format({'bg_color': _color(color)})
+            worksheet.conditional_format(first + 1, 0, last + 1, last_col, {**always, 'format': formats[color]})
+
+
+@traced("export.write")
+def write_highlighted_excel(target, df, fills=None, red_cells=None, sheet_name='Inventory', constant_memory=None,
+                            progress=None):
+    # Data and colours in a single pass; `target` is a path or a buffer and
+    # `fills` holds one colour per row ('' for none).
+    if constant_memory is None:
+        constant_memory = len(df) >= CONSTANT_MEMORY_ROWS
+    writer = open_writer(target, constant_memory)
+    write_sheet(writer, df, fills, red_cells, sheet_name, progress)
+    writer.close()
+
+
+@traced("export.final")
+def build_final_excel(df, green=None, blue=None, red_cells=None, sheet_name='Inventory', constant_memory=None):
+    fills = STATUS_FILLS[row_status(df, green, blue)]
+    output = BytesIO()
+    write_highlighted_excel(output, df, fills, red_cells, sheet_name, constant_memory)
+    output.seek(0)
+    return output
@@ -0,0 +1,209 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+
+import pandas as pd
+import streamlit as st
+
+from excel_export import STATUS_FILLS, row_status, write_highlighted_excel
+
+# Downloads are built on demand in a background thread and kept by content:
+# the same rows, highlights and format give the same export key, so reruns
+# (search keystrokes, page turns) reuse the finished file instead of writing
+# the whole workbook again.
+
+# --- Config ---
+MAX_EXPORTS = 8          # finished files kept in memory, least recently used dropped first
+CSV_CHUNK_ROWS = 50000
+POLL_INTERVAL = 1.0      # seconds between progress updates while a build runs
+FORMATS = {
+    "xlsx": ("Excel (highlighted)", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("CSV (fast, no colours)", "text/csv"),
+    "parquet": ("Parquet (fast, no colours)", "application/vnd.apache.parquet"),
+}
+
+_exports = OrderedDict()  # export key -> ExportJob
+_lock = threading.Lock()
+
+
+def data_digest(df, version=None):
+    # Fingerprint of the rows. A `version` (the store's write counter, a
+    # working copy's digest) stands in for hashing the whole frame.
+    if version is not None:
+        return f"v:{version}"
+    h = hashlib.sha256(repr([str(c) for c in df.columns]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def export_key(digest, fmt, status=None, red_cells=None):
+    h = hashlib.sha256(f"{digest}|{fmt}".encode())
+    if fmt == "xlsx":
+        # Colours only matter to the workbook
+        if status is not None:
+            h.update(status.tobytes())
+        if red_cells:
+            h.update(repr(sorted(map(repr, red_cells))).encode())
+    return h.hexdigest()
+
+
+def _parquet_frame(df):
+    # Parquet columns need one type; mixed cells (10234 next to "SN001") are
+    # written as text
+    out = df.copy()
+    for col in out.columns:
+        if out[col].dtype == object:
+            out[col] = out[col].where(out[col].isna(), out[col].astype(str))
+    out.columns = [str(c) for c in out.columns]
+    return out
+
+
+class ExportJob:
+    # Writes one download in a background thread. `source()` returns
+    # (df, fills, red_cells) and runs on that thread too. progress goes from
+    # 0 to 1; data holds the file's bytes once done.
+
+    def __init__(self, key, fmt, source, sheet_name="Inventory"):
+        self.key = key
+        self.fmt = fmt
+        self.sheet_name = sheet_name
+        self.progress = 0.0
+        self.done = False
+        self.error = None
+        self.data = None
+        self.seconds = None
+        self._source = source
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _set_progress(self, fraction):
+        self.progress = min(max(fraction, 0.0), 1.0)
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            df, fills, red_cells = self._source()
+            output = BytesIO()
+            if self.fmt == "xlsx":
+                write_highlighted_excel(output, df, fills, red_cells, self.sheet_name, progress=self._set_progress)
+            elif self.fmt == "csv":
+                for first in range(0, max(len(df), 1), CSV_CHUNK_ROWS):
+                    chunk = df.iloc[first:first + CSV_CHUNK_ROWS]
+                    output.write(chunk.to_csv(index=False, header=first == 0).encode("utf-8"))
+                    self._set_progress((first + len(chunk)) / max(len(df), 1))
+            elif self.fmt == "parquet":
+                _parquet_frame(df).to_parquet(output, index=False)
+            else:
+                raise ValueError(f"unknown export format: {self.fmt}")
+            self.data = output.getvalue()
+            self.progress = 1.0
+        except Exception as e:
+            self.error = e
+        finally:
+            self._source = None
+            self.seconds = time.perf_counter() - start
+            self.done = True
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return self.done
+
+
+def _evict():
+    # Caller holds _lock
+    for key in list(_exports):
+        if len(_exports) <= MAX_EXPORTS:
+            break
+        if _exports[key].done:
+            del _exports[key]
+
+
+def find_export(key):
+    with _lock:
+        job = _exports.get(key)
+        if job is not None:
+            _exports.move_to_end(key)
+        return job
+
+
+def start_export(key, fmt, source, sheet_name="Inventory"):
+    # Returns the export for `key`, starting a build if there is none yet (or
+    # the last one failed)
+    with _lock:
+        job = _exports.get(key)
+        if job is None or job.error is not None:
+            job = _exports[key] = ExportJob(key, fmt, source, sheet_name)
+            _evict()
+        _exports.move_to_end(key)
+        return job
+
+
+def frame_source(df, status=None, red_cells=None):
+    # Snapshot of what is on screen now; the app may change df on the next
+    # rerun. Copy-on-write makes a shallow copy enough.
+    df = df.copy(deep=False)
+    fills = STATUS_FILLS[status] if status is not None else None
+    red_cells = dict.fromkeys(red_cells, True) if red_cells else None
+    return lambda: (df, fills, red_cells)
+
+
+def download_panel(df, file_stem, key, green=None, blue=None, red_cells=None, version=None, source=None,
+                   sheet_name="Inventory"):
+    # Download section for the FINAL sheet. Nothing is written until the
+    # operator asks; the build runs in the background (with a progress bar)
+    # while they keep working. Pass `source` to export something other than
+    # df (see ExportJob), with `version` identifying its contents.
+    #
+    # Rows a button added or confirmed only exist in the rerun it was pressed
+    # in, so the next rerun's df may not be what "Prepare" built. The started
+    # job is remembered and offered until another one is prepared.
+    status = row_status(df, green, blue) if source is None else None
+    state_key = f"{key}_export"
+    started = find_export(st.session_state.get(state_key, ""))
+    polling = started is not None and not started.done
+    digests = {}
+
+    def current_key(fmt):
+        if "data" not in digests:
+            digests["data"] = data_digest(df, version)
+        return export_key(digests["data"], fmt, status, red_cells)
+
+    @st.fragment(run_every=POLL_INTERVAL if polling else None)
+    def panel():
+        fmt = st.radio("Download format", list(FORMATS), format_func=lambda f: FORMATS[f][0], horizontal=True,
+                       key=f"{key}_format")
+        label, mime = FORMATS[fmt]
+        if polling and started.done:
+            st.rerun()  # full rerun to stop polling
+        # Only fingerprint the data once this session has asked for a download
+        export = find_export(current_key(fmt)) if state_key in st.session_state else None
+        held = export is None and started is not None and started.fmt == fmt
+        if held:
+            export = started
+
+        def prepare():
+            if st.button(f"📦 Prepare {label}" + (" from the table as shown" if held else ""),
+                         key=f"{key}_prepare"):
+                new_key = current_key(fmt)
+                start_export(new_key, fmt, source or frame_source(df, status, red_cells), sheet_name)
+                st.session_state[state_key] = new_key
+                st.rerun()  # full rerun so the panel polls while it builds
+
+        if export is not None and export.done and export.error is None:
+            st.download_button(f"💾 Download {label}", export.data, file_name=f"{file_stem}.{fmt}", mime=mime,
+                               key=f"{key}_download")
+            if held:
+                st.caption(f"Built in {export.seconds:.1f} s from the table as it was when you pressed Prepare.")
+                prepare()
+            else:
+                st.caption(f"Built in {export.seconds:.1f} s; rebuilt only when the data or highlights change.")
+        elif export is not None and not export.done:
+            st.progress(export.progress, text=f"⏳ Preparing {label}... {export.progress:.0%}")
+        else:
+            if export is not None:
+                st.error(f"Export failed: {export.error}")
+            prepare()
+
+    panel()
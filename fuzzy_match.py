@@ -0,0 +1,167 @@
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from profiling import traced
+
+# --- Config ---
+MAX_DISTANCE = 2  # largest edit distance the index can answer
+MAX_RESULTS = 10
+
+
+def fuzzy_key(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    return str(value).strip().upper()
+
+
+def bounded_distance(a, b, k):
+    # Levenshtein distance, or k + 1 as soon as it must exceed k. Only the
+    # diagonal band of width 2k + 1 is computed.
+    if abs(len(a) - len(b)) > k:
+        return k + 1
+    if a == b:
+        return 0
+    big = k + 1
+    prev = [j if j <= k else big for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        lo, hi = max(1, i - k), min(len(b), i + k)
+        cur = [big] * (len(b) + 1)
+        cur[0] = i if i <= k else big
+        best = cur[0]
+        ca = a[i - 1]
+        for j in range(lo, hi + 1):
+            cost = prev[j - 1] + (ca != b[j - 1])
+            if prev[j] + 1 < cost:
+                cost = prev[j] + 1
+            if cur[j - 1] + 1 < cost:
+                cost = cur[j - 1] + 1
+            cur[j] = cost
+            if cost < best:
+                best = cost
+        if best > k:
+            return big
+        prev = cur
+    return min(prev[len(b)], big)
+
+
+def _segments(length, parts):
+    # (start, end) of `parts` near-equal segments of a string of `length`
+    base, extra = divmod(length, parts)
+    bounds, start = [], 0
+    for i in range(parts):
+        end = start + base + (1 if i < extra else 0)
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+class FuzzyIndex:
+    # Partition (pigeonhole) filter: every key is cut into max_distance + 2
+    # segments. A key within k edits of the query still has at least
+    # (segments - k) of them intact in the query, shifted by at most k
+    # positions, so only keys with that many segment hits get the edit-distance
+    # check. Lookups touch the posting lists of the query's
+    # own substrings instead of every row.
+
+    @traced("search.build_fuzzy_index")
+    def __init__(self, values, max_distance=MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.parts = max_distance + 2
+        self.keys = [fuzzy_key(v) for v in values]
+        self.exact = defaultdict(list)
+        postings = defaultdict(list)
+        self.short = []  # keys too short to partition; checked directly
+        for pos, key in enumerate(self.keys):
+            if not key:
+                continue
+            self.exact[key].append(pos)
+            length = len(key)
+            if length < self.parts:
+                self.short.append(pos)
+                continue
+            for i, (start, end) in enumerate(_segments(length, self.parts)):
+                postings[(length, i, key[start:end])].append(pos)
+        self.postings = {k: np.asarray(v, dtype=np.int64) for k, v in postings.items()}
+        self.short = np.asarray(self.short, dtype=np.int64)
+        self.lengths = np.fromiter((len(key) for key in self.keys), dtype=np.int64, count=len(self.keys))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _candidates(self, query, k):
+        needed = self.parts - k
+        hits = []
+        for length in range(max(self.parts, len(query) - k), len(query) + k + 1):
+            for i, (start, end) in enumerate(_segments(length, self.parts)):
+                width = end - start
+                seen = set()
+                for shift in range(-k, k + 1):
+                    s = start + shift
+                    if s < 0 or s + width > len(query):
+                        continue
+                    text = query[s:s + width]
+                    if text in seen:
+                        continue
+                    seen.add(text)
+                    ids = self.postings.get((length, i, text))
+                    if ids is not None:
+                        hits.append(ids)
+        if not hits:
+            return np.empty(0, dtype=np.int64)
+        # Distinct texts for the same segment hit disjoint keys, so counting
+        # ids across all lists counts intact segments per key.
+        counts = np.bincount(np.concatenate(hits), minlength=len(self.keys))
+        return np.flatnonzero(counts >= needed)
+
+    def _distances(self, query, positions):
+        # Edit distances from `query` to many keys at once: the usual DP, run
+        # column by column over numpy vectors of same-length candidates.
+        q = np.frombuffer(query.encode("utf-32-le"), dtype=np.uint32)
+        out = np.empty(len(positions), dtype=np.int64)
+        lengths = self.lengths[positions]
+        for length in np.unique(lengths):
+            group = np.flatnonzero(lengths == length)
+            text = "".join(self.keys[p] for p in positions[group])
+            keys = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).reshape(len(group), length)
+            prev = [np.full(len(group), j, dtype=np.int64) for j in range(length + 1)]
+            for i in range(1, len(q) + 1):
+                cur = [np.full(len(group), i, dtype=np.int64)]
+                for j in range(1, length + 1):
+                    cost = prev[j - 1] + (keys[:, j - 1] != q[i - 1])
+                    np.minimum(cost, prev[j] + 1, out=cost)
+                    np.minimum(cost, cur[j - 1] + 1, out=cost)
+                    cur.append(cost)
+                prev = cur
+            out[group] = prev[length]
+        return out
+
+    def _within(self, query, k, exclude):
+        candidates = np.union1d(self._candidates(query, k), self.short)
+        if exclude:
+            candidates = np.setdiff1d(candidates, np.fromiter(exclude, dtype=np.int64))
+        if len(candidates) == 0:
+            return []
+        distances = self._distances(query, candidates)
+        keep = distances <= k
+        return list(zip(distances[keep].tolist(), candidates[keep].tolist()))
+
+    def search(self, value, max_distance=None, limit=MAX_RESULTS):
+        # [(position, distance)] sorted by distance, then position. Widens the
+        # distance one step at a time and stops once `limit` matches are in
+        # hand: tighter bounds make for far fewer candidates.
+        k_max = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        query = fuzzy_key(value)
+        if not query:
+            return []
+        results = [(0, pos) for pos in self.exact.get(query, ())]
+        found = {pos for _, pos in results}
+        for k in range(1, k_max + 1):
+            if len(results) >= limit:
+                break
+            more = self._within(query, k, found)
+            results.extend(more)
+            found.update(pos for _, pos in more)
+        results.sort()
+        return [(pos, d) for d, pos in results[:limit]]
@@ -0,0 +1,245 @@
+import re
+import threading
+from collections import OrderedDict, defaultdict
+
+import pandas as pd
+
+from profiling import traced
+from reconcile import normalise_key, normalise_keys
+
+# Serial-number integrity for a loaded inventory: rows grouped by normalised
+# serial (case/whitespace-insensitive, as reconcile matches them), with the
+# duplicated, blank and malformed ones recorded. Built in one vectorized pass
+# when a workbook is loaded; after that an add or edit only updates the rows
+# it touches, so a confirm or add can be checked on the spot instead of by
+# scanning the frame.
+
+# --- Config ---
+KEY_COLUMN = "Serial Number"
+KEY_PATTERN = r"[0-9a-z]+(?:[-_/.][0-9a-z]+)*"   # normalised serials that don't match are "malformed"
+MAX_CACHED_FRAMES = 8
+MAX_SHOWN = 10          # conflicts listed before "... and N more"
+
+_indexes = OrderedDict()  # (digest, key column) -> IntegrityIndex
+_lock = threading.Lock()
+_key_pattern = re.compile(KEY_PATTERN)
+
+
+class Conflict:
+    # One thing wrong with a confirm or add. kind is "duplicate", "blank",
+    # "malformed", "multiple" (one confirm spanning several serials) or
+    # "exists" (an added serial that is already in the inventory).
+
+    def __init__(self, kind, key, rows, message):
+        self.kind = kind
+        self.key = key
+        self.rows = rows
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+def _labels(rows, limit=5):
+    rows = list(rows)
+    shown = ", ".join(map(str, rows[:limit]))
+    return shown + (f" and {len(rows) - limit} more" if len(rows) > limit else "")
+
+
+class IntegrityIndex:
+    # Rows loaded with the frame are found through a hashed Index of their
+    # keys; rows added, re-keyed or removed since are kept in `_changed` on
+    # top of it. duplicates/blank/malformed are maintained as rows change.
+    # Frames without the key column have nothing to check.
+
+    @traced("integrity.build")
+    def __init__(self, df, key_column=KEY_COLUMN):
+        self.key_column = key_column
+        self.n_rows = len(df)
+        self.present = key_column in df.columns
+        if self.present:
+            keys = normalise_keys(df[key_column])
+        else:
+            keys = pd.Series("", index=df.index, dtype=object)
+        self._labels = df.index
+        self._keys = pd.Index(keys.to_numpy(), dtype=object)   # position -> key
+        self._keys.get_indexer_for([""])     # hash the keys now, not on the first confirm
+        self._changed = {}                   # row -> key (None: removed), for rows changed since load
+        self._changed_keys = defaultdict(set)  # key -> rows in _changed
+
+        counts = keys[keys != ""].value_counts()
+        self.duplicates = {key: int(n) for key, n in counts[counts > 1].items()}   # key -> rows
+        self.blank = set(df.index[(keys == "").to_numpy()]) if self.present else set()
+        shaped = keys.str.fullmatch(KEY_PATTERN).fillna(False).astype(bool)
+        self.malformed = set(df.index[(~shaped & (keys != "")).to_numpy()])
+
+    # --- Lookups ---
+    def key_of(self, row):
+        # Normalised serial of a row; None if there is no such row
+        if row in self._changed:
+            return self._changed[row]
+        try:
+            position = self._labels.get_loc(row)
+        except (KeyError, TypeError):
+            return None
+        return self._keys[position] if isinstance(position, int) else None
+
+    def rows_for(self, key):
+        # Row labels with this normalised serial
+        positions = self._keys.get_indexer_for([key])
+        rows = [row for row in self._labels[positions[positions >= 0]].tolist() if row not in self._changed]
+        rows.extend(self._changed_keys.get(key, ()))
+        return rows
+
+    def counts(self):
+        return {
+            "duplicate_serials": len(self.duplicates),
+            "duplicate_rows": sum(self.duplicates.values()),
+            "blank": len(self.blank),
+            "malformed": len(self.malformed),
+        }
+
+    # --- Updates ---
+    def _recount(self, key):
+        if not key:
+            return
+        n = len(self.rows_for(key))
+        if n > 1:
+            self.duplicates[key] = n
+        else:
+            self.duplicates.pop(key, None)
+
+    def _move(self, row, key):
+        # Caller recounts the old and new keys
+        old = self._changed.pop(row, None)
+        if old is not None:
+            self._changed_keys[old].discard(row)
+            if not self._changed_keys[old]:
+                del self._changed_keys[old]
+        self.blank.discard(row)
+        self.malformed.discard(row)
+        if key is None:
+            if row in self._labels:
+                self._changed[row] = None  # hides the loaded row
+            return
+        self._changed[row] = key
+        self._changed_keys[key].add(row)
+        if not key:
+            self.blank.add(row)
+        elif not _key_pattern.fullmatch(key):
+            self.malformed.add(row)
+
+    def update(self, row, value):
+        # Row `row` (new or existing) now has serial `value`
+        old, key = self.key_of(row), normalise_key(value)
+        if old == key:
+            return
+        self._move(row, key)
+        self._recount(old)
+        self._recount(key)
+
+    def remove(self, row):
+        # Row `row` is gone (an add that was undone)
+        old = self.key_of(row)
+        if old is not None:
+            self._move(row, None)
+            self._recount(old)
+
+    # --- Checks ---
+    def check_confirm(self, rows):
+        # Conflicts in confirming `rows`: serials other rows share, blank or
+        # malformed serials, and one confirm covering several serials
+        rows = list(rows)
+        if not self.present:
+            return []
+        by_key = defaultdict(list)
+        for row in rows:
+            by_key[self.key_of(row)].append(row)
+        by_key.pop(None, None)
+        col = self.key_column
+        conflicts = []
+        if len(by_key.keys() - {""}) > 1:
+            conflicts.append(Conflict("multiple", None, rows,
+                                      f"These {len(rows)} rows have {len(by_key.keys() - {''})} different "
+                                      f"{col}s; check that every one of them was really seen."))
+        for key, confirming in by_key.items():
+            if not key:
+                conflicts.append(Conflict("blank", key, confirming,
+                                          f"No {col} on row(s) {_labels(confirming)}."))
+                continue
+            if key in self.duplicates:
+                shared = self.rows_for(key)
+                conflicts.append(Conflict("duplicate", key, shared,
+                                          f"{col} '{key}' is on {len(shared)} rows ({_labels(shared)}); "
+                                          f"confirming would count the machine more than once."))
+            if not _key_pattern.fullmatch(key):
+                conflicts.append(Conflict("malformed", key, confirming,
+                                          f"{col} '{key}' doesn't look like a serial number."))
+        return conflicts
+
+    def check_add(self, value, row=None):
+        # Conflicts in giving a new (or edited, pass its `row`) entry the
+        # serial `value`
+        key = normalise_key(value)
+        col = self.key_column
+        if not self.present:
+            return []
+        if not key:
+            return [Conflict("blank", key, [], f"The new entry has no {col}.")]
+        conflicts = []
+        existing = [r for r in self.rows_for(key) if r != row]
+        if existing:
+            conflicts.append(Conflict("exists", key, existing,
+                                      f"{col} '{key}' is already on row(s) {_labels(existing)}."))
+        if not _key_pattern.fullmatch(key):
+            conflicts.append(Conflict("malformed", key, [], f"{col} '{key}' doesn't look like a serial number."))
+        return conflicts
+
+
+def integrity_for(df, key_column=KEY_COLUMN):
+    # The integrity index of a loaded frame, built once per upload (see
+    # search_index.index_for). Don't update() a cached index: other reruns
+    # share it. Working copies keep their own.
+    digest = df.attrs.get("digest")
+    if digest is None:
+        return IntegrityIndex(df, key_column)
+    with _lock:
+        index = _indexes.get((digest, key_column))
+        if index is not None and index.n_rows == len(df):
+            _indexes.move_to_end((digest, key_column))
+            return index
+    index = IntegrityIndex(df, key_column)
+    with _lock:
+        _indexes[(digest, key_column)] = index
+        while len(_indexes) > MAX_CACHED_FRAMES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def show_conflicts(conflicts):
+    import streamlit as st
+
+    for conflict in conflicts[:MAX_SHOWN]:
+        st.warning(f"⚠️ {conflict}")
+    if len(conflicts) > MAX_SHOWN:
+        st.caption(f"... and {len(conflicts) - MAX_SHOWN} more.")
+
+
+def integrity_panel(index, expanded=False):
+    import streamlit as st
+
+    if not index.present:
+        return
+    counts = index.counts()
+    if not any(counts.values()):
+        st.caption(f"✅ Every {index.key_column} is present and unique.")
+        return
+    with st.expander(f"⚠️ {index.key_column} problems: {counts['duplicate_serials']} duplicated, "
+                     f"{counts['blank']} blank, {counts['malformed']} malformed", expanded=expanded):
+        if index.duplicates:
+            worst = sorted(index.duplicates.items(), key=lambda item: -item[1])[:MAX_SHOWN * 10]
+            st.dataframe(pd.DataFrame(worst, columns=[index.key_column, "rows"]), use_container_width=True)
+        if index.blank:
+            st.caption(f"No {index.key_column}: row(s) {_labels(sorted(index.blank, key=str), 20)}")
+        if index.malformed:
+            st.caption(f"Malformed: row(s) {_labels(sorted(index.malformed, key=str), 20)}")
@@ -0,0 +1,144 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from excel_cache import load_inventory
+from excel_export import build_final_excel
+from reconcile import CONFIRMED_FLAG, NEW_FLAG, read_scan_list, reconcile
+
+# Headless version of the upload -> reconcile -> FINAL export workflow, for
+# nightly runs over every site's workbook. Each workbook is one job; jobs run
+# in worker processes and each result is written as soon as it is done.
+#
+#   python inventory_batch.py sites/*.xlsx --scans scans/ --output-dir out/
+#   python inventory_batch.py master.xlsx --scans today.csv --summary runs.jsonl
+
+# --- Config ---
+KEY_COLUMN = "Serial Number"
+SCAN_EXTENSIONS = (".csv", ".txt")
+WORKERS = os.cpu_count() or 1
+
+
+def _expand(patterns):
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        paths.extend(matches if matches else [pattern])
+    return list(dict.fromkeys(paths))
+
+
+def find_scan_list(workbook, scans):
+    # `scans` is one scan file for every workbook, or a directory holding
+    # <workbook name>.csv/.txt per workbook
+    if scans is None:
+        return None
+    if not os.path.isdir(scans):
+        return scans
+    stem = os.path.splitext(os.path.basename(workbook))[0]
+    for ext in SCAN_EXTENSIONS:
+        path = os.path.join(scans, stem + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def process_workbook(workbook, scan_path, output_dir, key_column=KEY_COLUMN, sheet_name=0):
+    # One job: load, reconcile the scan list (if any), write the FINAL sheet.
+    # Returns a summary dict; runs in a worker process.
+    start = time.perf_counter()
+    df = load_inventory(workbook, sheet_name)
+    summary = {"workbook": workbook, "scans": scan_path, "rows": len(df)}
+
+    if scan_path is not None:
+        if key_column not in df.columns:
+            raise KeyError(f"{workbook}: no '{key_column}' column")
+        scans = read_scan_list(scan_path, key_column)
+        result = reconcile(df, scans, key_column)
+        df = result.df
+        summary.update(result.summary())
+        summary["scanned"] = len(scans)
+
+    # Same colours as the apps: confirmed rows green, new entries blue
+    flags = df["confirmed"] if "confirmed" in df.columns else None
+    green = (flags == CONFIRMED_FLAG).to_numpy() if flags is not None else None
+    blue = (flags == NEW_FLAG).to_numpy() if flags is not None else None
+
+    name = os.path.splitext(os.path.basename(workbook))[0]
+    output = os.path.join(output_dir, f"FINAL {name}.xlsx")
+    tmp_output = os.path.join(output_dir, f"~FINAL {name}.xlsx")
+    with open(tmp_output, "wb") as f:
+        f.write(build_final_excel(df, green=green, blue=blue).getvalue())
+    os.replace(tmp_output, output)
+
+    summary["output"] = output
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def _run_job(job):
+    try:
+        return process_workbook(*job)
+    except Exception as e:
+        return {"workbook": job[0], "scans": job[1], "error": f"{type(e).__name__}: {e}",
+                "traceback": traceback.format_exc()}
+
+
+def run_batch(workbooks, scans=None, output_dir=".", key_column=KEY_COLUMN, sheet_name=0,
+              workers=WORKERS):
+    # Yields one summary per workbook, in completion order
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(path, find_scan_list(path, scans), output_dir, key_column, sheet_name) for path in workbooks]
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield _run_job(job)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = [pool.submit(_run_job, job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile and export inventory workbooks without the UI.")
+    parser.add_argument("workbooks", nargs="+", help="workbook paths or glob patterns")
+    parser.add_argument("--scans", help="scan list for every workbook, or a directory of <workbook>.csv/.txt")
+    parser.add_argument("--output-dir", default="batch_output")
+    parser.add_argument("--key", default=KEY_COLUMN, help="serial number column")
+    parser.add_argument("--sheet", default=0, help="sheet name or index (default: first sheet)")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--summary", help="append one JSON line per workbook here")
+    args = parser.parse_args()
+
+    sheet = int(args.sheet) if str(args.sheet).isdigit() else args.sheet
+    workbooks = _expand(args.workbooks)
+    summary_file = open(args.summary, "a", encoding="utf-8") if args.summary else None
+    failed = 0
+    start = time.perf_counter()
+    try:
+        for done, result in enumerate(run_batch(workbooks, args.scans, args.output_dir, args.key, sheet,
+                                                args.workers), start=1):
+            if "error" in result:
+                failed += 1
+                print(f"[{done}/{len(workbooks)}] FAILED {result['workbook']}: {result['error']}", file=sys.stderr)
+            else:
+                counts = ", ".join(f"{k} {result[k]}" for k in ("confirmed", "added") if k in result)
+                print(f"[{done}/{len(workbooks)}] {result['workbook']} -> {result['output']}"
+                      f" ({result['rows']} rows{', ' + counts if counts else ''}, {result['seconds']} s)")
+            if summary_file is not None:
+                result = {k: v for k, v in result.items() if k != "traceback"}
+                summary_file.write(json.dumps(result) + "\n")
+                summary_file.flush()
+    finally:
+        if summary_file is not None:
+            summary_file.close()
+    print(f"{len(workbooks) - failed} of {len(workbooks)} workbook(s) done in {time.perf_counter() - start:.1f} s")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import sqlite3
+from contextlib import contextmanager
+
+import pandas as pd
+
+from excel_export import row_fills, write_highlighted_excel
+from profiling import traced
+
+# --- Config ---
+TABLE = "inventory"
+ROW_ID = "row_id"  # 0-based, same as the row index the apps show
+COLOR = "color"    # row fill, e.g. "90EE90" ('' for none)
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sql_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+
+def _sql_value(value):
+    if value is None:
+        return None
+    if not isinstance(value, str) and pd.isna(value):
+        return None
+    if hasattr(value, "item"):  # numpy scalars
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat(sep=" ")
+    return value
+
+
+class InventoryDB:
+    # SQLite store for the live inventory. WAL mode lets many sessions read
+    # while one writes, and every Add/Update/Confirm is a single-row
+    # transaction instead of a rewrite of the whole workbook.
+
+    def __init__(self, path="inventory.db", key_column="Serial Number"):
+        self.path = path
+        self.key_column = key_column
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call: sqlite3 connections can't be
+        # shared across Streamlit's script threads.
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def exists(self):
+        with self._connect() as conn:
+            row = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (TABLE,)).fetchone()
+        return row is not None
+
+    def version(self):
+        # Bumped on every write; use it as a cache key for read_frame()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key='version'").fetchone()
+        return row[0] if row else 0
+
+    def _bump(self, conn):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('version', 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+        )
+
+    def columns(self):
+        with self._connect() as conn:
+            info = conn.execute(f"PRAGMA table_info({_quote(TABLE)})").fetchall()
+        return [row[1] for row in info if row[1] not in (ROW_ID, COLOR)]
+
+    # --- Import / export ---
+    def import_frame(self, df, color_map=None):
+        color_map = color_map or {}
+        cols = [str(c) for c in df.columns]
+        col_defs = ", ".join(f"{_quote(c)} {_sql_type(df[c].dtype)}" for c in df.columns)
+        placeholders = ", ".join("?" for _ in range(len(cols) + 2))
+        rows = (
+            (pos, *(_sql_value(v) for v in values), str(color_map.get(pos, "")))
+            for pos, values in enumerate(df.itertuples(index=False, name=None))
+        )
+        with self._connect() as conn:
+            conn.execute(f"DROP TABLE IF EXISTS {_quote(TABLE)}")
+            conn.execute(
+                f"CREATE TABLE {_quote(TABLE)} ({ROW_ID} INTEGER PRIMARY KEY, {col_defs}, {COLOR} TEXT DEFAULT '')"
+            )
+            conn.executemany(f"INSERT INTO {_quote(TABLE)} VALUES ({placeholders})", rows)
+            if self.key_column in cols:
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_key ON {_quote(TABLE)} ({_quote(self.key_column)})"
+                )
+            self._bump(conn)
+
+    def import_excel(self, path, sheet_name=0, color_map=None):
+        self.import_frame(pd.read_excel(path, sheet_name=sheet_name), color_map)
+
+    def export_frame(self):
+        # (rows, per-row fill colours) as written to Excel
+        df, colors = self.read_frame(with_colors=True)
+        return df, row_fills(len(df), dict(enumerate(colors)))
+
+    @traced("db.export")
+    def export_excel(self, target, sheet_name="Sheet1"):
+        df, fills = self.export_frame()
+        write_highlighted_excel(target, df, fills, sheet_name=sheet_name)
+
+    # --- Reads ---
+    @traced("db.read")
+    def read_frame(self, with_colors=False):
+        with self._connect() as conn:
+            df = pd.read_sql_query(f"SELECT * FROM {_quote(TABLE)} ORDER BY {ROW_ID}", conn, index_col=ROW_ID)
+        df.index.name = None
+        colors = df.pop(COLOR).fillna("").tolist()
+        if with_colors:
+            return df, colors
+        return df
+
+    @traced("db.find")
+    def find(self, value, column=None):
+        # Exact match on an indexed column (the serial number by default)
+        column = column or self.key_column
+        with self._connect() as conn:
+            df = pd.read_sql_query(
+                f"SELECT * FROM {_quote(TABLE)} WHERE {_quote(column)} = ? ORDER BY {ROW_ID}",
+                conn,
+                params=(value,),
+                index_col=ROW_ID,
+            )
+        df.index.name = None
+        return df.drop(columns=[COLOR])
+
+    # --- Row-level writes ---
+    @traced("db.update")
+    def update_row(self, row_id, values, color=None):
+        cols = [c for c in values if c not in (ROW_ID, COLOR)]
+        assignments = [f"{_quote(c)} = ?" for c in cols]
+        params = [_sql_value(values[c]) for c in cols]
+        if color is not None:
+            assignments.append(f"{COLOR} = ?")
+            params.append(color)
+        if not assignments:
+            return
+        with self._connect() as conn:
+            cur = conn.execute(
+                f"UPDATE {_quote(TABLE)} SET {', '.join(assignments)} WHERE {ROW_ID} = ?",
+                (*params, int(row_id)),
+            )
+            if cur.rowcount == 0:
+                raise KeyError(f"No inventory row {row_id}")
+            self._bump(conn)
+
+    @traced("db.add")
+    def add_row(self, values, color=""):
+        cols = [c for c in values if c not in (ROW_ID, COLOR)]
+        names = ", ".join([ROW_ID, *(_quote(c) for c in cols), COLOR])
+        placeholders = ", ".join("?" for _ in range(len(cols) + 1))
+        with self._connect() as conn:
+            # Single statement, so two sessions adding at once can't pick the same id
+            cur = conn.execute(
+                f"INSERT INTO {_quote(TABLE)} ({names}) "
+                f"SELECT COALESCE(MAX({ROW_ID}) + 1, 0), {placeholders} FROM {_quote(TABLE)}",
+                (*(_sql_value(values[c]) for c in cols), color),
+            )
+            self._bump(conn)
+        return cur.lastrowid
@@ -0,0 +1,110 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+# --- Config ---
+CATEGORY_MAX_UNIQUE = 1000   # text columns with at most this many values...
+CATEGORY_MAX_RATIO = 0.5     # ...and repeating enough become categoricals
+
+# Values the apps write into these columns; seeded as categories so confirms
+# and adds can set them in place. These columns are always categorical, even
+# when a fresh template leaves them blank (which would load as float64).
+MARKER_CATEGORIES = {
+    "REMARKS": ["", "Confirmed", "New entry added"],
+    "confirmed": ["", "Y", "B"],
+}
+
+_NULLABLE_INTS = [
+    ("Int8", -2 ** 7, 2 ** 7 - 1),
+    ("Int16", -2 ** 15, 2 ** 15 - 1),
+    ("Int32", -2 ** 31, 2 ** 31 - 1),
+]
+
+# Arrow-backed strings. NaN as the missing value keeps comparisons plain
+# bool (a blank REMARKS == "Confirmed" is False, not <NA>).
+try:
+    TEXT_DTYPE = pd.StringDtype("pyarrow", na_value=np.nan)
+except (TypeError, ImportError):
+    TEXT_DTYPE = pd.StringDtype()
+
+
+def _compact_numeric(numeric):
+    non_null = numeric.dropna()
+    if not (non_null % 1 == 0).all():
+        return numeric.astype("float64")
+    if len(non_null) == len(numeric):
+        return pd.to_numeric(numeric.astype("int64"), downcast="integer")
+    # Blanks in an integer column: nullable ints instead of float64, so
+    # serial-like numbers stay exact
+    low, high = non_null.min(), non_null.max()
+    for dtype, lower, upper in _NULLABLE_INTS:
+        if lower <= low and high <= upper:
+            return numeric.astype(dtype)
+    return numeric.astype("Int64")
+
+
+def _compact_column(s):
+    non_null = s.dropna()
+    if non_null.empty:
+        return s
+    if isinstance(s.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(s.dtype):
+        return s
+    if pd.api.types.is_datetime64_any_dtype(s.dtype):
+        return s
+    if pd.api.types.is_numeric_dtype(s.dtype):
+        return _compact_numeric(s)
+
+    kinds = set(non_null.map(type))
+    if kinds <= {int, float}:
+        return _compact_numeric(pd.to_numeric(s))
+
+    if kinds <= {datetime.datetime, pd.Timestamp}:
+        return pd.to_datetime(s)
+
+    if kinds <= {str}:
+        return s.astype(TEXT_DTYPE)
+
+    # Mixed cells (e.g. 10234 next to "SN001") stay as Python objects
+    return s
+
+
+def compact_dtypes(chunk):
+    return pd.DataFrame({col: _compact_column(chunk[col]) for col in chunk.columns}, index=chunk.index)
+
+
+def _categorise(s, name):
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        categories = s.cat.categories
+    elif name in MARKER_CATEGORIES:
+        values = s.astype(object).where(s.notna(), None)
+        s = values.astype(pd.CategoricalDtype(pd.Index(values.dropna().unique(), dtype=object)))
+        categories = s.cat.categories
+    elif isinstance(s.dtype, pd.StringDtype):
+        unique = s.nunique()
+        if unique > CATEGORY_MAX_UNIQUE or unique > CATEGORY_MAX_RATIO * len(s):
+            return s
+        s = s.astype("category")
+        categories = s.cat.categories
+    else:
+        return s
+    markers = [m for m in MARKER_CATEGORIES.get(name, ()) if m not in categories]
+    if markers:
+        s = s.cat.add_categories(markers)
+    return s
+
+
+def normalise_frame(df):
+    # Compact dtypes for a loaded inventory: downcast / nullable ints, Arrow
+    # strings, and categoricals for repetitive text (Status, REMARKS, ...).
+    # Missing cells stay missing (NaN/<NA>), which Excel gets back as blanks.
+    out = compact_dtypes(df)
+    for col in out.columns:
+        out[col] = _categorise(out[col], col)
+    out.attrs.update(df.attrs)
+    return out
+
+
+def frame_memory(df):
+    # Bytes used by the frame, string contents included
+    return int(df.memory_usage(deep=True, index=True).sum())
@@ -0,0 +1,321 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from profiling import traced
+from search_index import bitmap, index_for
+
+# Multi-column filters over the loaded inventory, e.g.
+#
+#   Status = Pending AND Product Name contains widget AND Quantity < 10
+#   (Status in (Pending, "In Use") OR Quantity >= 100) AND NOT Site = Depot
+#
+# Each predicate is answered from a per-column index (search_index): a bitmap
+# index for categorical columns, the sorted index for ranges and numeric
+# columns, the hash/trigram index for other text. Predicates become packed
+# bitmaps (one bit per row) and AND/OR/NOT work on those, so no row is looked
+# at after the indexes exist. Text matches ignore case, like the search box.
+
+# --- Config ---
+KEYWORDS = {"and", "or", "not", "contains", "in"}
+OPERATORS = {"=": "=", "==": "=", "!=": "!=", "<>": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">=",
+             "~": "contains", "contains": "contains", "in": "in"}
+RANGE_OPERATORS = ("<", "<=", ">", ">=")
+BUILDER_OPERATORS = ["=", "!=", "contains", "<", "<=", ">", ">="]
+BITMAP_MAX_VALUES = 10000   # text columns with at most this many distinct values use the bitmap index
+
+_TOKEN = re.compile(r"""\s*(?:
+    (?P<quoted>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|`[^`]*`)
+  | (?P<op><=|>=|!=|<>|==|=|<|>|~|\(|\)|,)
+  | (?P<word>[^\s()<>=!~,"'`]+)
+)""", re.VERBOSE)
+
+
+class QueryError(ValueError):
+    pass
+
+
+def _tokens(text):
+    # [(kind, text)]; kind is "quoted", "op", "word" or "keyword"
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None or match.end() == pos:
+            raise QueryError(f"can't read the query at: {text[pos:].strip()[:20]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "quoted":
+            value = re.sub(r"\\(.)", r"\1", value[1:-1]) if value[0] != "`" else value[1:-1]
+        elif kind == "word" and value.lower() in KEYWORDS:
+            kind = "keyword"
+        tokens.append((kind, value))
+    return tokens
+
+
+class _Parser:
+    # OR binds loosest, then AND, then NOT. Column names and values may be
+    # several words (Serial Number = In Use); quote them to use a keyword or
+    # an operator character inside.
+
+    def __init__(self, text):
+        self.tokens = _tokens(text)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def keyword(self, *names):
+        kind, value = self.peek()
+        return kind == "keyword" and value.lower() in names
+
+    def take(self, kind=None, value=None):
+        token = self.peek()
+        if token[0] is None or (kind and token[0] != kind) or (value and token[1] != value):
+            raise QueryError(f"expected {value or kind} but found {self.found()}")
+        self.pos += 1
+        return token
+
+    def found(self):
+        kind, value = self.peek()
+        return "the end of the query" if kind is None else repr(value)
+
+    def parse(self):
+        if not self.tokens:
+            return None
+        node = self.expression()
+        if self.pos < len(self.tokens):
+            raise QueryError(f"unexpected {self.tokens[self.pos][1]!r}")
+        return node
+
+    def expression(self):
+        terms = [self.term()]
+        while self.keyword("or"):
+            self.take()
+            terms.append(self.term())
+        return terms[0] if len(terms) == 1 else ("or", terms)
+
+    def term(self):
+        factors = [self.factor()]
+        while self.keyword("and"):
+            self.take()
+            factors.append(self.factor())
+        return factors[0] if len(factors) == 1 else ("and", factors)
+
+    def factor(self):
+        if self.keyword("not"):
+            self.take()
+            return ("not", self.factor())
+        if self.peek() == ("op", "("):
+            self.take()
+            node = self.expression()
+            self.take("op", ")")
+            return node
+        return self.predicate()
+
+    def words(self, what, stop=KEYWORDS):
+        # One quoted string, or bare words up to the next operator or `stop`
+        # keyword
+        if self.peek()[0] == "quoted":
+            return self.take()[1]
+        words = []
+        while self.peek()[0] == "word" or (self.peek()[0] == "keyword" and not self.keyword(*stop)):
+            words.append(self.take()[1])
+        if not words:
+            raise QueryError(f"expected a {what} but found {self.found()}")
+        return " ".join(words)
+
+    def predicate(self):
+        column = self.words("column name")
+        kind, op = self.peek()
+        op = op.lower() if kind == "keyword" else op
+        if kind not in ("op", "keyword") or op not in OPERATORS:
+            raise QueryError(f"expected an operator (=, !=, <, <=, >, >=, contains, in) after {column!r}")
+        self.take()
+        op = OPERATORS[op]
+        # Values end at AND/OR, so "Status = In Use" needs no quotes
+        if op != "in":
+            return ("pred", column, op, self.words("value", ("and", "or")))
+        self.take("op", "(")
+        values = [self.words("value", ("and", "or"))]
+        while self.peek() == ("op", ","):
+            self.take()
+            values.append(self.words("value", ("and", "or")))
+        self.take("op", ")")
+        return ("pred", column, op, values)
+
+
+def parse_query(text):
+    # Query text -> tree of ("and"|"or", [nodes]), ("not", node) and
+    # ("pred", column, op, value); None for an empty query
+    return _Parser(text).parse()
+
+
+def _column(df, name):
+    if name in df.columns:
+        return name
+    wanted = name.strip().lower()
+    for col in df.columns:
+        if str(col).strip().lower() == wanted:
+            return col
+    raise QueryError(f"no column named {name!r}; columns are: {', '.join(map(str, df.columns))}")
+
+
+def _index_kind(df, index, name):
+    # Which index answers equality and contains on this column. Text columns
+    # with few distinct values (Status, Product Name) get the bitmap index
+    # too; serial numbers and other mostly-unique text use the hash index.
+    dtype = df[name].dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return "bitmap"
+    if pd.api.types.is_datetime64_any_dtype(dtype) or (
+            pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)):
+        return "sorted"
+    return "bitmap" if len(index.bitmaps(df, name).codes) <= BITMAP_MAX_VALUES else "hash"
+
+
+def _invert(bits, n_rows):
+    inverted = ~bits
+    if n_rows % 8:
+        inverted[-1] &= (0xFF << (8 - n_rows % 8)) & 0xFF  # keep the padding bits clear
+    return inverted
+
+
+def _range(op, number):
+    if op in ("<", "<="):
+        return {"high": number, "high_inclusive": op == "<="}
+    return {"low": number, "low_inclusive": op == ">="}
+
+
+def _numbers(sorted_index, values):
+    numbers = [sorted_index.number(v) for v in values]
+    return [n for n in numbers if n is not None]
+
+
+def _predicate(df, index, column, op, value):
+    name = _column(df, column)
+    n_rows = len(df)
+    if op == "!=":
+        return _invert(_predicate(df, index, name, "=", value), n_rows)
+    if op in RANGE_OPERATORS:
+        sorted_index = index.sorted(df, name)
+        number = sorted_index.number(value)
+        if number is None:
+            raise QueryError(f"{column} {op} {value!r}: compare with a {'date' if sorted_index.dates else 'number'}")
+        return bitmap(n_rows, sorted_index.range_positions(**_range(op, number)))
+
+    kind = _index_kind(df, index, name)
+    if op == "contains":
+        if kind == "bitmap":
+            return index.bitmaps(df, name).contains_bitmap(value)
+        return bitmap(n_rows, index.column(df, name).contains_positions(value))
+
+    values = value if op == "in" else [value]
+    if kind == "bitmap":
+        return index.bitmaps(df, name).equal_bitmap(values)
+    if kind == "sorted":
+        sorted_index = index.sorted(df, name)
+        positions = [sorted_index.range_positions(n, n) for n in _numbers(sorted_index, values)]
+    else:
+        column_index = index.column(df, name)
+        positions = [np.asarray(column_index.exact_positions(v), dtype=np.intp) for v in values]
+    return bitmap(n_rows, np.concatenate(positions) if positions else [])
+
+
+def _estimate(df, index, node):
+    # Rough number of matching rows, so an AND evaluates its most selective
+    # predicates first and can stop as soon as nothing is left. Only asks
+    # indexes that already exist; anything else counts as every row.
+    if node[0] != "pred" or node[2] not in ("=", "in"):
+        return len(df)
+    try:
+        name = _column(df, node[1])
+    except QueryError:
+        return 0  # fail fast on a misspelled column
+    values = node[3] if node[2] == "in" else [node[3]]
+    bitmaps = index.bitmap_columns.get(name)
+    if bitmaps is not None:
+        return sum(bitmaps.count(v) for v in values)
+    return len(df)
+
+
+def _evaluate(df, index, node):
+    if node[0] == "pred":
+        return _predicate(df, index, *node[1:])
+    if node[0] == "not":
+        return _invert(_evaluate(df, index, node[1]), len(df))
+
+    children = node[1]
+    if node[0] == "and":
+        children = sorted(children, key=lambda child: _estimate(df, index, child))
+    result = None
+    for child in children:
+        bits = _evaluate(df, index, child)
+        result = bits if result is None else (result & bits if node[0] == "and" else result | bits)
+        if node[0] == "and" and not result.any():
+            break
+    return result
+
+
+@traced("search.query")
+def query_match(df, query):
+    # Row labels matching `query` (text or a parse_query() tree). An empty
+    # query matches every row, like an empty search box. Raises QueryError
+    # for a query that can't be read or names a missing column.
+    node = parse_query(query) if isinstance(query, str) else query
+    if node is None:
+        return df.index
+    bits = _evaluate(df, index_for(df), node)
+    return df.index[np.flatnonzero(np.unpackbits(bits, count=len(df)))]
+
+
+def _quote(text):
+    # A column name or value as the parser reads it back
+    text = str(text)
+    plain = re.fullmatch(r"[^\s()<>=!~,\"'`\\]+(?: [^\s()<>=!~,\"'`\\]+)*", text)
+    if plain and not KEYWORDS & {word.lower() for word in text.split()}:
+        return text
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def query_panel(df, key, expanded=False):
+    # Filter builder: pick column/operator/value and "Add condition", or type
+    # the query directly. Shows the matching rows; returns their labels, or
+    # None while there is no (valid) query.
+    import streamlit as st
+
+    from table_view import paged_table
+
+    query_key = f"{key}_query"
+
+    def add_condition():
+        column = st.session_state[f"{key}_query_column"]
+        condition = (f"{_quote(column)} {st.session_state[f'{key}_query_op']} "
+                     f"{_quote(st.session_state.get(f'{key}_query_value', ''))}")
+        current = st.session_state.get(query_key, "").strip()
+        join = st.session_state.get(f"{key}_query_join", "AND")
+        st.session_state[query_key] = f"{current} {join} {condition}" if current else condition
+
+    with st.expander("🧮 Filter with several conditions", expanded=expanded):
+        column_col, op_col, value_col, join_col = st.columns([3, 2, 3, 1])
+        column_col.selectbox("Column", df.columns, key=f"{key}_query_column")
+        op_col.selectbox("Condition", BUILDER_OPERATORS, key=f"{key}_query_op")
+        value_col.text_input("Value", key=f"{key}_query_value")
+        join_col.radio("Join", ["AND", "OR"], key=f"{key}_query_join")
+        st.button("➕ Add condition", key=f"{key}_query_add", on_click=add_condition)
+
+        text = st.text_area("Query", key=query_key, height=68,
+                            placeholder='Status = Pending AND "Product Name" contains widget AND Quantity < 10')
+        if not text.strip():
+            return None
+        try:
+            labels = query_match(df, text)
+        except QueryError as e:
+            st.error(f"❌ {e}")
+            return None
+        st.caption(f"{len(labels)} of {len(df)} row(s) match.")
+        paged_table(df.loc[labels], f"{key}_query_rows", use_container_width=True)
+        return labels
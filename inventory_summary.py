@@ -0,0 +1,161 @@
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+# Stock-take counts (confirmed "Y", new "B", unmarked) and Quantity totals by
+# Status. Built once from the frame with vectorized counts, then kept up to
+# date by replace() as single rows change, without looking at the frame
+# again.
+
+# --- Config ---
+QUANTITY_COLUMN = "Quantity"
+STATUS_COLUMN = "Status"
+MARK_COLUMN = "confirmed"
+REMARKS_COLUMN = "REMARKS"
+CONFIRMED, NEW, UNMARKED = "Y", "B", ""
+REMARK_MARKS = {"Confirmed": CONFIRMED, "New entry added": NEW}   # REMARKS written with each mark
+HISTORY_SECONDS = 60     # changes within one such window share a progress point
+MAX_HISTORY = 5000
+
+
+def quantity_value(value):
+    # Quantities typed into the app arrive as text ("12"); blanks and
+    # non-numbers count as 0
+    try:
+        quantity = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if quantity != quantity else quantity
+
+
+def status_value(value):
+    return "" if value is None or pd.isna(value) else str(value)
+
+
+def row_mark(mark, remarks):
+    # Mark a saved row already carries: its `confirmed` cell (Y/B), or else
+    # its REMARKS (test_8 only writes those)
+    mark = status_value(mark).strip().upper()
+    if mark in (CONFIRMED, NEW):
+        return mark
+    return REMARK_MARKS.get(status_value(remarks).strip(), UNMARKED)
+
+
+def frame_marks(df):
+    # row_mark() of every row, as an object array
+    marks = np.full(len(df), UNMARKED, dtype=object)
+    if REMARKS_COLUMN in df.columns:
+        remarks = df[REMARKS_COLUMN].astype(object).where(df[REMARKS_COLUMN].notna(), "").astype(str).str.strip()
+        marks = remarks.map(REMARK_MARKS).fillna(UNMARKED).to_numpy(dtype=object)
+    if MARK_COLUMN in df.columns:
+        mark = df[MARK_COLUMN].astype(object).where(df[MARK_COLUMN].notna(), "").astype(str).str.strip().str.upper()
+        mark = mark.to_numpy(dtype=object)
+        marks = np.where(np.isin(mark, [CONFIRMED, NEW]), mark, marks)
+    return marks
+
+
+class InventorySummary:
+    # Plain counters, so a confirm, add or edit is a couple of additions
+    # whatever the size of the inventory. Without `marks`, rows count as
+    # the workbook marks them (see frame_marks), so a re-uploaded, partly
+    # done stock-take starts from where it was.
+
+    def __init__(self, df, marks=None, quantity_column=QUANTITY_COLUMN, status_column=STATUS_COLUMN, at=None):
+        self.quantity_column = quantity_column
+        self.status_column = status_column
+        self.rows = len(df)
+        self.counts = Counter({CONFIRMED: 0, NEW: 0, UNMARKED: 0})
+        self.quantity = defaultdict(float)   # status -> total Quantity
+        self.history = []                    # [(time, confirmed, new, unmarked)]
+
+        if marks is None:
+            marks = frame_marks(df)
+        marks = pd.Series(np.asarray(marks, dtype=object)).fillna(UNMARKED)
+        self.counts.update(marks.value_counts().to_dict())
+        if quantity_column in df.columns:
+            quantity = pd.to_numeric(df[quantity_column], errors="coerce").fillna(0).astype(float)
+            if status_column in df.columns:
+                status = df[status_column].astype(object).where(df[status_column].notna(), "").astype(str)
+                self.quantity.update(quantity.groupby(status.to_numpy()).sum().to_dict())
+            else:
+                self.quantity[""] = float(quantity.sum())
+        self.record(at)
+
+    # --- Updates ---
+    def row(self, mark, status, quantity):
+        # A row's contribution, as replace() takes it
+        return mark or UNMARKED, status_value(status), quantity_value(quantity)
+
+    def replace(self, old, new):
+        # One row changed from `old` to `new` (see row()); None for a row
+        # that didn't exist before (an add) or doesn't any more (an undone add)
+        if old is not None:
+            mark, status, quantity = old
+            self.rows -= 1
+            self.counts[mark] -= 1
+            self.quantity[status] -= quantity
+        if new is not None:
+            mark, status, quantity = new
+            self.rows += 1
+            self.counts[mark] += 1
+            self.quantity[status] += quantity
+
+    def record(self, at=None):
+        # Progress point for the history; one per HISTORY_SECONDS window,
+        # holding the latest counts in that window
+        at = time.time() if at is None else at
+        point = (at, self.counts[CONFIRMED], self.counts[NEW], self.counts[UNMARKED])
+        if self.history and int(self.history[-1][0] // HISTORY_SECONDS) == int(at // HISTORY_SECONDS):
+            self.history[-1] = point
+        else:
+            self.history.append(point)
+            del self.history[:-MAX_HISTORY]
+
+    # --- Reads ---
+    @property
+    def confirmed(self):
+        return self.counts[CONFIRMED]
+
+    @property
+    def new(self):
+        return self.counts[NEW]
+
+    @property
+    def unmarked(self):
+        return self.counts[UNMARKED]
+
+    def done_fraction(self):
+        return (self.rows - self.unmarked) / self.rows if self.rows else 0.0
+
+    def quantity_by_status(self):
+        totals = pd.Series(dict(self.quantity), dtype=float).rename(self.quantity_column)
+        totals = totals.round(9)
+        totals = totals[totals != 0].sort_index()
+        totals.index.name = self.status_column
+        return totals
+
+    def history_frame(self):
+        history = pd.DataFrame(self.history, columns=["time", "confirmed", "new", "unmarked"])
+        history["time"] = pd.to_datetime(history["time"], unit="s")
+        return history.set_index("time")
+
+
+def summary_panel(summary, expanded=True):
+    import streamlit as st
+
+    with st.expander("📊 Stock-take Summary", expanded=expanded):
+        confirmed_col, new_col, unmarked_col = st.columns(3)
+        confirmed_col.metric("✅ Confirmed (Y)", summary.confirmed)
+        new_col.metric("➕ New (B)", summary.new)
+        unmarked_col.metric("⬜ Unmarked", summary.unmarked)
+        st.progress(summary.done_fraction(), text=f"{summary.done_fraction():.1%} of {summary.rows} rows checked")
+
+        totals = summary.quantity_by_status()
+        if not totals.empty:
+            st.caption(f"{summary.quantity_column} by {summary.status_column}")
+            st.bar_chart(totals)
+        if len(summary.history) > 1:
+            st.caption("Progress over time")
+            st.line_chart(summary.history_frame())
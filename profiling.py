@@ -0,0 +1,254 @@
+import argparse
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+# --- Config ---
+ENABLED = os.environ.get("INVENTORY_PROFILE", "") not in ("", "0")
+TRACE_DIR = os.environ.get("INVENTORY_TRACE_DIR", ".traces")
+TRACE_FILE = "trace.jsonl"
+TRACE_MAX_BYTES = 10 * 1024 * 1024   # roll over to trace.jsonl.1 ... at this size
+TRACE_BACKUPS = 5
+
+_local = threading.local()   # the trace of the rerun running on this thread
+_write_lock = threading.Lock()
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss():
+    # Resident set size in bytes (Linux); None where /proc isn't available
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Trace:
+    # Timing spans of one script rerun. Spans nest; each records its depth
+    # so the panel can show the breakdown as a tree.
+
+    def __init__(self, app):
+        self.app = app
+        self.started = time.time()
+        self.spans = []   # [name, depth, start offset s, duration s, rss delta bytes]
+        self.depth = 0
+        self._t0 = time.perf_counter()
+        self._rss0 = _rss()
+        self.duration = None
+        self.rss_delta = None
+
+    def finish(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._t0
+            rss = _rss()
+            if rss is not None and self._rss0 is not None:
+                self.rss_delta = rss - self._rss0
+        return self
+
+    def to_dict(self):
+        return {
+            "app": self.app,
+            "time": self.started,
+            "duration": self.duration,
+            "rss_delta": self.rss_delta,
+            "spans": [
+                {"name": name, "depth": depth, "start": start, "duration": duration, "rss_delta": rss_delta}
+                for name, depth, start, duration, rss_delta in self.spans
+            ],
+        }
+
+
+class _Span:
+    __slots__ = ("trace", "name", "entry", "start", "rss")
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        trace = self.trace
+        self.entry = [self.name, trace.depth, 0.0, 0.0, None]
+        trace.spans.append(self.entry)
+        trace.depth += 1
+        self.rss = _rss()
+        self.start = time.perf_counter()
+        self.entry[2] = self.start - trace._t0
+        return self
+
+    def __exit__(self, *exc):
+        self.entry[3] = time.perf_counter() - self.start
+        rss = _rss()
+        if rss is not None and self.rss is not None:
+            self.entry[4] = rss - self.rss
+        self.trace.depth -= 1
+        return False
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def current():
+    return getattr(_local, "trace", None)
+
+
+def span(name):
+    # `with span("export"):` -- a shared no-op when no trace is running
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        return _NULL_SPAN
+    return _Span(trace, name)
+
+
+def traced(name):
+    # Decorator form of span(). With profiling off at import time the
+    # function is returned untouched, so there is no overhead at all.
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            trace = getattr(_local, "trace", None)
+            if trace is None:
+                return fn(*args, **kwargs)
+            with _Span(trace, name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# --- Rerun lifecycle ---
+def start_rerun(app):
+    # Call at the top of the app script. A trace left open by a rerun that
+    # was interrupted (st.rerun(), a widget change) is written out first.
+    if not ENABLED:
+        return None
+    previous = getattr(_local, "trace", None)
+    if previous is not None:
+        write_trace(previous.finish())
+    _local.trace = Trace(app)
+    return _local.trace
+
+
+def finish_rerun():
+    trace = getattr(_local, "trace", None)
+    _local.trace = None
+    if trace is None:
+        return None
+    write_trace(trace.finish())
+    return trace
+
+
+# --- Rolling JSON-lines traces ---
+def _rotate(path):
+    for i in range(TRACE_BACKUPS - 1, 0, -1):
+        older = f"{path}.{i}"
+        if os.path.exists(older):
+            os.replace(older, f"{path}.{i + 1}")
+    os.replace(path, f"{path}.1")
+
+
+def write_trace(trace, trace_dir=None):
+    path = os.path.join(trace_dir or TRACE_DIR, TRACE_FILE)
+    line = json.dumps(trace.to_dict()) + "\n"
+    with _write_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) + len(line) > TRACE_MAX_BYTES:
+            _rotate(path)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def read_traces(trace_dir=None):
+    pattern = os.path.join(trace_dir or TRACE_DIR, TRACE_FILE + "*")
+    for path in sorted(glob.glob(pattern)):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def summarise(traces):
+    # {(app, span): {"count", "p50", "p95", "p99", "max"}} in seconds; the
+    # whole rerun is reported as span "rerun".
+    durations = defaultdict(list)
+    for trace in traces:
+        if trace.get("duration") is not None:
+            durations[(trace["app"], "rerun")].append(trace["duration"])
+        for s in trace.get("spans", ()):
+            durations[(trace["app"], s["name"])].append(s["duration"])
+    return {
+        key: {
+            "count": len(values),
+            "p50": _percentile(values, 0.50),
+            "p95": _percentile(values, 0.95),
+            "p99": _percentile(values, 0.99),
+            "max": max(values),
+        }
+        for key, values in durations.items()
+    }
+
+
+# --- Sidebar panel ---
+def panel():
+    # Finishes this rerun's trace and shows its breakdown in the sidebar.
+    # Call once at the end of the script; does nothing with profiling off.
+    trace = finish_rerun()
+    if trace is None:
+        return
+    import streamlit as st
+
+    with st.sidebar.expander("⏱️ Profile (this rerun)", expanded=False):
+        st.caption(f"Total {trace.duration * 1000:.1f} ms"
+                   + (f", RSS {trace.rss_delta / 2**20:+.1f} MB" if trace.rss_delta is not None else ""))
+        rows = [
+            {
+                "stage": "  " * depth + name,
+                "ms": round(duration * 1000, 2),
+                "% of rerun": round(100 * duration / trace.duration, 1) if trace.duration else 0.0,
+                "Δ MB": None if rss_delta is None else round(rss_delta / 2**20, 2),
+            }
+            for name, depth, _, duration, rss_delta in trace.spans
+        ]
+        if rows:
+            st.table(rows)
+        else:
+            st.caption("No instrumented stages ran.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency percentiles from the rolling profile traces.")
+    parser.add_argument("--dir", default=TRACE_DIR)
+    parser.add_argument("--app", help="only this app's traces")
+    args = parser.parse_args()
+
+    traces = (t for t in read_traces(args.dir) if args.app is None or t.get("app") == args.app)
+    stats = summarise(traces)
+    print(f"{'app':<12} {'stage':<28} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for (app, name), s in sorted(stats.items()):
+        print(f"{app:<12} {name:<28} {s['count']:>6} {s['p50'] * 1000:>9.2f} {s['p95'] * 1000:>9.2f} "
+              f"{s['p99'] * 1000:>9.2f} {s['max'] * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import os
+from io import BytesIO
+
+import pandas as pd
+
+from excel_cache import file_bytes
+from profiling import traced
+
+# Same markers test_9 uses for single confirms/adds
+CONFIRMED_REMARK = "Confirmed"
+NEW_REMARK = "New entry added"
+CONFIRMED_FLAG = "Y"
+NEW_FLAG = "B"
+
+
+def normalise_keys(values):
+    # Case/whitespace-insensitive serial keys; blanks -> ''. Integral floats
+    # (12345.0 from a numeric Excel column) compare equal to "12345".
+    s = pd.Series(values)
+    if pd.api.types.is_float_dtype(s) and (s.dropna() % 1 == 0).all():
+        s = s.astype("Int64")
+    keys = s.astype("string").str.strip().str.lower().fillna("")
+    # Object dtype: pandas' hash-table isin/duplicated are far faster on it
+    # than on Arrow-backed strings
+    return pd.Series(keys.to_numpy(dtype=object), index=s.index, dtype=object)
+
+
+def normalise_key(value):
+    # normalise_keys() for one value (a typed-in or edited serial)
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip().lower()
+
+
+def read_scan_list(uploaded_file, key_column=None):
+    # Text files: one serial per line. CSV: the key column if present,
+    # otherwise the first column.
+    data = file_bytes(uploaded_file)
+    name = uploaded_file if isinstance(uploaded_file, str) else getattr(uploaded_file, "name", "") or ""
+    if os.path.splitext(name)[1].lower() == ".csv":
+        scans = pd.read_csv(BytesIO(data), dtype=str, keep_default_na=False)
+        column = key_column if key_column in scans.columns else scans.columns[0]
+        values = scans[column]
+    else:
+        values = pd.Series(data.decode("utf-8-sig").splitlines(), dtype=object)
+    values = values.str.strip()
+    return values[values != ""].reset_index(drop=True)
+
+
+class ReconcileResult:
+    def __init__(self, df, found, added, duplicate_scans, duplicate_rows):
+        self.df = df                            # inventory with confirms + new rows
+        self.found = found                      # index of confirmed inventory rows
+        self.added = added                      # index of rows added for unknown serials
+        self.duplicate_scans = duplicate_scans  # serial -> times scanned (> 1)
+        self.duplicate_rows = duplicate_rows    # matched rows that share a serial
+
+    def summary(self):
+        return {
+            "confirmed": len(self.found),
+            "added": len(self.added),
+            "duplicate_scans": len(self.duplicate_scans),
+            "duplicate_rows": len(self.duplicate_rows),
+        }
+
+
+@traced("reconcile")
+def reconcile(df, scans, key_column):
+    scans = pd.Series(scans, dtype=object).reset_index(drop=True)
+    scan_keys = normalise_keys(scans)
+    keep = scan_keys != ""
+    scans, scan_keys = scans[keep], scan_keys[keep]
+    inv_keys = normalise_keys(df[key_column]).set_axis(df.index)
+
+    # Found rows: one hash join of inventory keys against the scanned set
+    scanned = pd.Index(scan_keys.unique())
+    found_mask = inv_keys.isin(scanned) & (inv_keys != "")
+    found = df.index[found_mask.to_numpy()]
+
+    counts = scan_keys.value_counts()
+    duplicate_scans = counts[counts > 1]
+    duplicate_rows = df.index[(found_mask & inv_keys.duplicated(keep=False)).to_numpy()]
+
+    # Unknown serials, first spelling as scanned, once each
+    unknown = ~scan_keys.isin(pd.Index(inv_keys.unique()))
+    new_serials = scans[unknown][~scan_keys[unknown].duplicated()]
+
+    out = df.copy()
+    for col, markers in (("REMARKS", [CONFIRMED_REMARK, NEW_REMARK]), ("confirmed", [CONFIRMED_FLAG, NEW_FLAG])):
+        if col not in out.columns:
+            out[col] = ""
+        elif isinstance(out[col].dtype, pd.CategoricalDtype):
+            missing = [m for m in ["", *markers] if m not in out[col].cat.categories]
+            if missing:
+                out[col] = out[col].cat.add_categories(missing)
+        else:
+            # A blank template column loads as float64, which can't take text
+            out[col] = out[col].astype(object)
+    out.loc[found, "REMARKS"] = CONFIRMED_REMARK
+    out.loc[found, "confirmed"] = CONFIRMED_FLAG
+
+    added = pd.Index([])
+    if len(new_serials):
+        new_rows = pd.DataFrame({key_column: new_serials.to_numpy()})
+        new_rows["REMARKS"] = NEW_REMARK
+        new_rows["confirmed"] = NEW_FLAG
+        new_rows = new_rows.reindex(columns=out.columns, fill_value="")
+        new_rows.index = pd.RangeIndex(len(out), len(out) + len(new_rows))
+        out = pd.concat([out, new_rows])
+        added = new_rows.index
+
+    return ReconcileResult(out, found, added, duplicate_scans, duplicate_rows)
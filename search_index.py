@@ -0,0 +1,263 @@
+import threading
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+import pandas as pd
+
+from fuzzy_match import MAX_DISTANCE, MAX_RESULTS, FuzzyIndex
+from profiling import traced
+
+# --- Config ---
+GRAM = 3
+MAX_CACHED_FRAMES = 8
+
+_indexes = OrderedDict()  # digest -> SearchIndex
+_lock = threading.Lock()
+
+
+def _grams(text):
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+def search_key(value):
+    # Missing cells search as blanks instead of as the literal string "nan"
+    # or "<NA>".
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    return str(value).lower()
+
+
+def search_keys(values):
+    # search_key() for a whole column. Categoricals only convert their
+    # categories; Arrow strings are lowercased in one vectorized call.
+    s = pd.Series(values)
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        lookup = np.array([search_key(c) for c in s.cat.categories] + [""], dtype=object)
+        return lookup[s.cat.codes.to_numpy()].tolist()  # code -1 (missing) -> ""
+    if isinstance(s.dtype, pd.StringDtype):
+        return s.str.lower().fillna("").tolist()
+    return [search_key(v) for v in s.tolist()]
+
+
+class ColumnIndex:
+    @traced("search.build_index")
+    def __init__(self, values):
+        self.keys = search_keys(values)
+        self.exact = defaultdict(list)
+        self.grams = defaultdict(list)
+        for pos, key in enumerate(self.keys):
+            self.exact[key].append(pos)
+            for gram in _grams(key):
+                self.grams[gram].append(pos)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def exact_positions(self, value):
+        return list(self.exact.get(search_key(value), ()))
+
+    def contains_positions(self, value):
+        query = search_key(value)
+        if not query:
+            return list(range(len(self.keys)))
+        if len(query) < GRAM:
+            # Too short for a trigram lookup; still no per-rerun astype(str)
+            return [pos for pos, key in enumerate(self.keys) if query in key]
+
+        postings = []
+        for gram in _grams(query):
+            hits = self.grams.get(gram)
+            if not hits:
+                return []
+            postings.append(hits)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for hits in postings[1:]:
+            candidates.intersection_update(hits)
+            if not candidates:
+                return []
+        # Trigrams can all be present without being contiguous; verify the hits.
+        return sorted(pos for pos in candidates if query in self.keys[pos])
+
+
+def bitmap(n_rows, positions):
+    # Row positions as a packed bitmap (one bit per row), for the query engine
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[positions] = True
+    return np.packbits(mask)
+
+
+class BitmapIndex:
+    # Equality index for categorical columns: each row's value as a small
+    # integer code, with rows grouped by code. A value's bitmap is built from
+    # its rows the first time it is asked for.
+
+    @traced("search.build_bitmap_index")
+    def __init__(self, values):
+        s = pd.Series(values)
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            # Categories that only differ in case share a code
+            keys = [search_key(c) for c in s.cat.categories] + [""]
+            key_codes, uniques = pd.factorize(np.array(keys, dtype=object))
+            codes = key_codes[s.cat.codes.to_numpy()]
+        else:
+            codes, uniques = pd.factorize(np.array(search_keys(s), dtype=object))
+        self.n_rows = len(s)
+        self.codes = {key: code for code, key in enumerate(uniques)}
+        self._order = np.argsort(codes, kind="stable")
+        self._bounds = np.searchsorted(codes[self._order], np.arange(len(uniques) + 1))
+        self._bitmaps = {}
+
+    def __len__(self):
+        return self.n_rows
+
+    def count(self, value):
+        code = self.codes.get(search_key(value))
+        return 0 if code is None else int(self._bounds[code + 1] - self._bounds[code])
+
+    def positions(self, code):
+        return self._order[self._bounds[code]:self._bounds[code + 1]]
+
+    def _bitmap(self, code):
+        bits = self._bitmaps.get(code)
+        if bits is None:
+            bits = self._bitmaps[code] = bitmap(self.n_rows, self.positions(code))
+        return bits
+
+    def equal_bitmap(self, values):
+        # Rows equal to any of `values`, ignoring case
+        codes = {self.codes.get(search_key(v)) for v in values} - {None}
+        if len(codes) == 1:
+            return self._bitmap(codes.pop())
+        return bitmap(self.n_rows, np.concatenate([self.positions(c) for c in codes] or [np.empty(0, np.intp)]))
+
+    def contains_bitmap(self, value):
+        # Substring search over the distinct values only
+        query = search_key(value)
+        return self.equal_bitmap([key for key in self.codes if query in key])
+
+
+class SortedIndex:
+    # Range index: the column's numbers (or timestamps) in sorted order with
+    # their row positions, so a range is two binary searches. Cells that
+    # aren't numbers are left out.
+
+    @traced("search.build_sorted_index")
+    def __init__(self, values):
+        s = pd.Series(values)
+        self.dates = pd.api.types.is_datetime64_any_dtype(s.dtype)
+        if self.dates:
+            numbers = s.dt.tz_localize(None) if getattr(s.dt, "tz", None) is not None else s
+            numbers = numbers.astype("datetime64[ns]").to_numpy()
+            numbers = np.where(np.isnat(numbers), np.nan, numbers.view("int64").astype(float))
+        else:
+            numbers = pd.to_numeric(s, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        valid = np.flatnonzero(~np.isnan(numbers))
+        self.n_rows = len(s)
+        self.order = valid[np.argsort(numbers[valid], kind="stable")]
+        self.values = numbers[self.order]
+
+    def __len__(self):
+        return self.n_rows
+
+    def number(self, value):
+        # A query value in the index's units, or None if it isn't one
+        try:
+            if self.dates:
+                stamp = pd.Timestamp(value)
+                if pd.isna(stamp):
+                    return None
+                return float((stamp.tz_localize(None) if stamp.tz is not None else stamp).value)
+            number = float(value)
+        except (TypeError, ValueError, OverflowError):
+            return None
+        return None if number != number else number
+
+    def range_positions(self, low=None, high=None, low_inclusive=True, high_inclusive=True):
+        first = 0 if low is None else np.searchsorted(self.values, low, "left" if low_inclusive else "right")
+        last = len(self.values) if high is None else np.searchsorted(self.values, high,
+                                                                     "right" if high_inclusive else "left")
+        return self.order[first:max(first, last)]
+
+
+class SearchIndex:
+    # One per loaded frame, shared by every rerun/session that loaded the same
+    # workbook. Column indexes are built lazily, the first time a column is
+    # searched.
+
+    def __init__(self, n_rows):
+        self.n_rows = n_rows
+        self.columns = {}
+        self.fuzzy_columns = {}
+        self.bitmap_columns = {}
+        self.sorted_columns = {}
+        self._lock = threading.Lock()
+
+    def column(self, df, name):
+        with self._lock:
+            index = self.columns.get(name)
+            if index is None:
+                index = ColumnIndex(df[name])
+                self.columns[name] = index
+            return index
+
+    def fuzzy(self, df, name):
+        with self._lock:
+            index = self.fuzzy_columns.get(name)
+            if index is None:
+                index = FuzzyIndex(df[name].tolist())
+                self.fuzzy_columns[name] = index
+            return index
+
+    def bitmaps(self, df, name):
+        with self._lock:
+            index = self.bitmap_columns.get(name)
+            if index is None:
+                index = BitmapIndex(df[name])
+                self.bitmap_columns[name] = index
+            return index
+
+    def sorted(self, df, name):
+        with self._lock:
+            index = self.sorted_columns.get(name)
+            if index is None:
+                index = SortedIndex(df[name])
+                self.sorted_columns[name] = index
+            return index
+
+
+def index_for(df):
+    digest = df.attrs.get("digest")
+    if digest is None:
+        return SearchIndex(len(df))
+    with _lock:
+        index = _indexes.get(digest)
+        if index is None or index.n_rows != len(df):
+            index = SearchIndex(len(df))
+            _indexes[digest] = index
+            while len(_indexes) > MAX_CACHED_FRAMES:
+                _indexes.popitem(last=False)
+        else:
+            _indexes.move_to_end(digest)
+        return index
+
+
+@traced("search.exact")
+def exact_match(df, column, value):
+    positions = index_for(df).column(df, column).exact_positions(value)
+    return df.index[positions]
+
+
+@traced("search.contains")
+def contains_match(df, column, value):
+    positions = index_for(df).column(df, column).contains_positions(value)
+    return df.index[positions]
+
+
+@traced("search.fuzzy")
+def fuzzy_match(df, column, value, max_distance=MAX_DISTANCE, limit=MAX_RESULTS):
+    # Near misses for a serial (typos, a dropped or extra character): edit
+    # distance by row label, closest first. Case/whitespace are ignored.
+    matches = index_for(df).fuzzy(df, column).search(value, max_distance, limit)
+    positions = [pos for pos, _ in matches]
+    return pd.Series([d for _, d in matches], index=df.index[positions], dtype="int64")
@@ -0,0 +1,211 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+
+from profiling import traced
+
+# One copy of each loaded inventory per process, however many sessions have
+# it open. Frames are written once to an Arrow IPC file and memory-mapped, so
+# the data lives in file-backed pages (shared with other worker processes,
+# reclaimable by the OS) instead of every session's heap. Sessions get
+# copy-on-write views: a session that edits a column pays for that column,
+# not for the frame.
+
+# --- Config ---
+STORE_DIR = os.environ.get("INVENTORY_STORE_DIR", ".inventory_store")
+MAX_IDLE_BYTES = int(os.environ.get("INVENTORY_STORE_IDLE_BYTES", 1024 * 1024 * 1024))  # unused tables kept for reuse
+MAX_DISK_BYTES = int(os.environ.get("INVENTORY_STORE_DISK_BYTES", 4 * 1024 * 1024 * 1024))  # .arrow files kept on disk
+
+_tables = OrderedDict()  # key -> SharedTable, least recently used first
+_lock = threading.RLock()  # re-entrant: a view's finalizer may run while the lock is held
+
+# Views rely on copy-on-write, which is always on from pandas 3 (pinned in
+# requirements.txt): writing to a view copies the column instead of writing
+# through to the mapped buffers.
+
+
+def _path(key):
+    return os.path.join(STORE_DIR, f"{key}.arrow")
+
+
+def _write_ipc(path, table):
+    os.makedirs(STORE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def prune_directory(directory, max_bytes, suffixes, keep=()):
+    # Deletes the least recently used files (by mtime; readers touch files
+    # they hit) until those with `suffixes` fit in max_bytes. Paths in `keep`
+    # are never deleted.
+    try:
+        names = [n for n in os.listdir(directory) if n.endswith(suffixes)]
+    except FileNotFoundError:
+        return
+    files = []
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue  # removed by another process meanwhile
+        files.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    keep = {os.path.abspath(path) for path in keep}
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if os.path.abspath(path) in keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _map(path):
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    # split_blocks keeps one block per column, so the frame wraps the mapped
+    # buffers without consolidating (copying) them
+    return table, table.to_pandas(split_blocks=True)
+
+
+class SharedTable:
+    # A loaded inventory held once for the whole process. refs counts the
+    # views and overlays using it; unused tables stay mapped (for the next
+    # upload of the same file) until MAX_IDLE_BYTES pushes them out.
+
+    def __init__(self, key, df):
+        self.key = key
+        self.refs = 0
+        self.mapped = False
+        path = _path(key)
+        try:
+            if os.path.exists(path):
+                _touch(path)
+            else:
+                _write_ipc(path, pa.Table.from_pandas(df, preserve_index=False))
+                _prune_store(keep=[path])
+            table, self._frame = _map(path)
+            self.nbytes = table.nbytes
+            self.mapped = True
+        except Exception:
+            # Arrow can't hold object columns that mix numbers and text (e.g.
+            # 10234 next to "SN001"); such frames are shared from the heap
+            if os.path.exists(path) and not self.mapped:
+                os.remove(path)
+            self._frame = df.reset_index(drop=True)
+            self.nbytes = int(df.memory_usage(deep=True).sum())
+        self._frame.attrs = {}
+
+    def view(self):
+        # Copy-on-write frame over the shared data. The table stays referenced
+        # for as long as the view is alive.
+        df = self._frame.copy(deep=False)
+        _acquire(self)
+        weakref.finalize(df, release, self)
+        return df
+
+
+def _acquire(table):
+    with _lock:
+        table.refs += 1
+
+
+def _evict():
+    # Caller holds _lock
+    idle = sum(t.nbytes for t in _tables.values() if t.refs == 0)
+    for key in list(_tables):
+        if idle <= MAX_IDLE_BYTES:
+            break
+        table = _tables[key]
+        if table.refs == 0:
+            # Views still alive elsewhere keep the mapping open; dropping the
+            # entry only means the next load maps the file again
+            del _tables[key]
+            idle -= table.nbytes
+
+
+def _prune_store(keep=()):
+    # Files of tables in use here stay; idle tables whose file goes are
+    # forgotten, so the next load writes and maps it again
+    with _lock:
+        keep = list(keep) + [_path(key) for key, table in _tables.items() if table.refs]
+    prune_directory(STORE_DIR, MAX_DISK_BYTES, (".arrow",), keep)
+    with _lock:
+        for key in [k for k, t in _tables.items() if not t.refs and t.mapped and not os.path.exists(_path(k))]:
+            del _tables[key]
+
+
+def release(table):
+    with _lock:
+        table.refs = max(table.refs - 1, 0)
+        if table.refs == 0:
+            _evict()
+
+
+@traced("store.open")
+def open_table(key, load):
+    # The shared table for `key`, creating it from load() (which returns the
+    # frame) on first use
+    with _lock:
+        table = _tables.get(key)
+        if table is not None:
+            _tables.move_to_end(key)
+            return table
+    table = SharedTable(key, load())
+    with _lock:
+        # Another session may have loaded the same file meanwhile
+        table = _tables.setdefault(key, table)
+        _tables.move_to_end(key)
+        return table
+
+
+def shared_frame(key, load):
+    return open_table(key, load).view()
+
+
+def find_frame(key):
+    # View of an already open table, or None; never loads anything
+    with _lock:
+        table = _tables.get(key)
+        if table is None:
+            return None
+        _tables.move_to_end(key)
+    return table.view()
+
+
+def store_stats():
+    with _lock:
+        return [
+            {"key": t.key, "refs": t.refs, "bytes": t.nbytes, "mapped": t.mapped}
+            for t in _tables.values()
+        ]
+
+
+def clear_store(disk=False):
+    with _lock:
+        _tables.clear()
+    if disk and os.path.isdir(STORE_DIR):
+        for name in os.listdir(STORE_DIR):
+            if name.endswith(".arrow"):
+                os.remove(os.path.join(STORE_DIR, name))
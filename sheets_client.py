@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pandas as pd
+
+from profiling import traced
+
+# --- Config ---
+SCOPE = ["https://spreadsheets.google.com/feeds",
+         "https://www.googleapis.com/auth/drive"]
+STALENESS_SECONDS = 30        # serve the local mirror without any API call
+FULL_RESYNC_SECONDS = 10 * 60  # re-download everything at least this often
+
+_clients = {}  # creds_path -> authorized gspread client
+_mirrors = {}  # (creds_path, sheet_url) -> SheetMirror
+_lock = threading.Lock()
+
+
+def get_client(creds_path):
+    # One authorized client per credentials file, shared by every rerun/session
+    with _lock:
+        client = _clients.get(creds_path)
+        if client is None:
+            # gspread/oauth2client are only loaded once a sheet is opened
+            import gspread
+            from oauth2client.service_account import ServiceAccountCredentials
+
+            creds = ServiceAccountCredentials.from_json_keyfile_name(creds_path, SCOPE)
+            client = gspread.authorize(creds)
+            _clients[creds_path] = client
+        return client
+
+
+def _records_frame(values):
+    # Same shape as pd.DataFrame(sheet.get_all_records())
+    from gspread.utils import numericise_all
+
+    if not values:
+        return pd.DataFrame()
+    header, rows = values[0], values[1:]
+    rows = [numericise_all(row, empty2zero=False, default_blank="") for row in rows]
+    return pd.DataFrame(rows, columns=header)
+
+
+class SheetMirror:
+    # Local copy of one worksheet. refresh() is free inside the staleness
+    # window, costs one Drive metadata call when the sheet hasn't changed, and
+    # only downloads the appended rows when it grew. A full download happens
+    # when rows were edited (nothing new at the tail) and every
+    # FULL_RESYNC_SECONDS as a safety net.
+
+    def __init__(self, spreadsheet, worksheet=None, staleness=STALENESS_SECONDS,
+                 full_resync=FULL_RESYNC_SECONDS, clock=time.monotonic):
+        self.spreadsheet = spreadsheet
+        self.worksheet = worksheet or spreadsheet.sheet1
+        self.staleness = staleness
+        self.full_resync = full_resync
+        self._clock = clock
+        self._values = None
+        self._frame = None
+        self._modified = None
+        self._checked_at = None
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    def _last_update_time(self):
+        try:
+            return self.spreadsheet.get_lastUpdateTime()
+        except Exception:
+            # No Drive access: treat the sheet as changed and check the tail
+            return None
+
+    def _full_sync(self, now):
+        self._values = self.worksheet.get_all_values()
+        self._frame = None
+        self._synced_at = now
+
+    def _tail_sync(self):
+        # Rows beyond what we already mirror (appends)
+        from gspread.utils import rowcol_to_a1
+
+        width = len(self._values[0]) if self._values else 1
+        last_col = rowcol_to_a1(1, width).rstrip("0123456789")
+        tail = self.worksheet.get_values(f"A{len(self._values) + 1}:{last_col}")
+        tail = [row for row in tail if any(cell != "" for cell in row)]
+        if tail:
+            self._values.extend(row + [""] * (width - len(row)) for row in tail)
+            self._frame = None
+        return bool(tail)
+
+    @traced("sheets.refresh")
+    def refresh(self, force=False):
+        with self._lock:
+            now = self._clock()
+            if self._values is None or force or now - self._synced_at >= self.full_resync:
+                self._modified = self._last_update_time()
+                self._full_sync(now)
+            elif now - self._checked_at >= self.staleness:
+                modified = self._last_update_time()
+                if modified is None or modified != self._modified:
+                    if not self._tail_sync():
+                        self._full_sync(now)
+                    self._modified = modified
+            self._checked_at = now
+            return self
+
+    def frame(self):
+        self.refresh()
+        with self._lock:
+            if self._frame is None:
+                self._frame = _records_frame(self._values)
+            return self._frame.copy()
+
+    def appended(self, rows):
+        # Record rows we wrote ourselves so they don't trigger a re-download
+        with self._lock:
+            if self._values is None:
+                return
+            width = len(self._values[0]) if self._values else 0
+            for row in rows:
+                row = ["" if v is None else str(v) for v in row]
+                self._values.append(row + [""] * (width - len(row)))
+            self._frame = None
+            self._modified = self._last_update_time()
+
+    def invalidate(self):
+        # Next refresh() checks the sheet even inside the staleness window
+        with self._lock:
+            self._checked_at = float("-inf")
+
+
+def get_sheet_mirror(sheet_url, creds_path, staleness=STALENESS_SECONDS):
+    key = (creds_path, sheet_url)
+    with _lock:
+        mirror = _mirrors.get(key)
+    if mirror is None:
+        spreadsheet = get_client(creds_path).open_by_url(sheet_url)
+        mirror = SheetMirror(spreadsheet, staleness=staleness)
+        with _lock:
+            mirror = _mirrors.setdefault(key, mirror)
+    mirror.staleness = staleness
+    return mirror
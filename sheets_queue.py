@@ -0,0 +1,208 @@
+import json
+import os
+import random
+import threading
+import time
+
+from profiling import traced
+
+# --- Config ---
+JOURNAL_DIR = os.environ.get("SHEETS_JOURNAL_DIR", ".sheets_journal")
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 2.0    # wait this long for more rows before sending a batch
+MIN_BACKOFF = 1.0
+MAX_BACKOFF = 64.0
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+_queues = {}  # journal path -> AppendQueue
+_lock = threading.Lock()
+
+
+def _status(exc):
+    code = getattr(exc, "code", None)
+    if code is None and getattr(exc, "response", None) is not None:
+        code = exc.response.status_code
+    return code
+
+
+def is_retryable(exc):
+    # Quota (429) and server errors are retried; other API errors mean the
+    # request itself is bad. Anything that isn't an APIError is treated as a
+    # network problem and retried.
+    from gspread.exceptions import APIError
+
+    if isinstance(exc, APIError):
+        return _status(exc) in RETRYABLE_STATUS
+    return True
+
+
+class AppendQueue:
+    # Write-behind buffer for worksheet appends. put() journals the row to disk
+    # and returns immediately; a background worker sends journaled rows in
+    # batches with append_rows(), backing off on quota/server errors. Rows
+    # still in the journal are re-sent after a restart (at-least-once).
+
+    def __init__(self, worksheet, journal_path, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 on_flushed=None, sleep=time.sleep, value_input_option="RAW"):
+        self.worksheet = worksheet
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flushed = on_flushed
+        self.value_input_option = value_input_option
+        self.last_error = None
+        self.sent = 0
+        self._sleep = sleep
+        self._pending = []  # [(id, row)]
+        self._next_id = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._urgent = False
+
+        os.makedirs(os.path.dirname(journal_path) or ".", exist_ok=True)
+        self._replay()
+        self._journal = open(journal_path, "a", encoding="utf-8")
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    # --- Journal ---
+    def _replay(self):
+        if not os.path.exists(self.journal_path):
+            return
+        rows, acked = {}, set()
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash mid-write
+                if "ack" in entry:
+                    acked.update(entry["ack"])
+                else:
+                    rows[entry["id"]] = entry["row"]
+        self._pending = [(i, row) for i, row in sorted(rows.items()) if i not in acked]
+        self._next_id = max(rows, default=-1) + 1
+        # Start the journal over with only what is still unsent
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for i, row in self._pending:
+                f.write(json.dumps({"id": i, "row": row}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    def _write(self, entry):
+        self._journal.write(json.dumps(entry) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    # --- Producer side ---
+    @traced("sheets.enqueue")
+    def put(self, row):
+        row = ["" if v is None else v for v in row]
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("append queue is closed")
+            entry_id = self._next_id
+            self._next_id += 1
+            self._write({"id": entry_id, "row": row})
+            self._pending.append((entry_id, row))
+            self._cond.notify()
+        return entry_id
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    # --- Worker ---
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return None
+            # Give a burst of entries a moment to pile up into one request
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._pending) < self.batch_size and not (self._closed or self._urgent):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            self._urgent = False
+            return self._pending[:self.batch_size]
+
+    def _send(self, batch):
+        backoff = MIN_BACKOFF
+        rows = [row for _, row in batch]
+        while True:
+            try:
+                self.worksheet.append_rows(rows, value_input_option=self.value_input_option)
+                self.last_error = None
+                return True
+            except Exception as e:
+                self.last_error = e
+                if not is_retryable(e):
+                    return False
+                self._sleep(backoff + random.uniform(0, backoff / 2))
+                backoff = min(backoff * 2, MAX_BACKOFF)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            ok = self._send(batch)
+            if not ok:
+                # The API rejected these rows outright; park them next to the
+                # journal instead of retrying forever.
+                with open(self.journal_path + ".failed", "a", encoding="utf-8") as f:
+                    for i, row in batch:
+                        f.write(json.dumps({"id": i, "row": row, "error": str(self.last_error)}) + "\n")
+            ids = [i for i, _ in batch]
+            with self._cond:
+                self._write({"ack": ids})
+                del self._pending[:len(batch)]
+                if not self._pending:
+                    # Everything is sent; start the journal over so it doesn't grow forever
+                    self._journal.seek(0)
+                    self._journal.truncate()
+                if ok:
+                    self.sent += len(batch)
+                self._cond.notify_all()
+            if ok and self.on_flushed is not None:
+                try:
+                    self.on_flushed([row for _, row in batch])
+                except Exception:
+                    pass
+
+    def flush(self, timeout=None):
+        # Wait until everything queued so far has been sent (or parked)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._urgent = True
+            self._cond.notify_all()
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join(timeout)
+        self._journal.close()
+
+
+def get_append_queue(mirror, journal_dir=JOURNAL_DIR):
+    # One queue (and journal file) per worksheet for the whole process
+    name = f"{mirror.spreadsheet.id}-{mirror.worksheet.id}"
+    path = os.path.join(journal_dir, f"{name}.jsonl")
+    with _lock:
+        queue = _queues.get(path)
+        if queue is None:
+            queue = AppendQueue(mirror.worksheet, path, on_flushed=mirror.appended)
+            _queues[path] = queue
+        return queue
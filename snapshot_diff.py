@@ -0,0 +1,255 @@
+import argparse
+import re
+import zipfile
+from collections import OrderedDict
+from io import BytesIO
+from xml.etree import ElementTree
+
+import numpy as np
+import pandas as pd
+
+from excel_cache import file_bytes, file_digest, load_inventory
+from excel_export import BLUE, CONSTANT_MEMORY_ROWS, GREEN, open_writer, write_sheet
+from profiling import traced
+from reconcile import normalise_keys
+
+# --- Config ---
+KEY_COLUMN = "Serial Number"
+STATUS_COLUMNS = ("REMARKS", "confirmed", "Status")  # a change here is a status change
+STATUS_COLOURS = (GREEN, BLUE)  # so is a change of row colour (test_4 marks matches only by colour)
+CHANGE_COLUMN = "Change"
+MAX_CACHED_HIGHLIGHTS = 8
+
+_highlights = OrderedDict()  # (file digest, sheet) -> row colours
+_NS = {"m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+
+ADDED, STATUS, EDITED = "added", "status changed", "edited"
+
+
+class SnapshotDiff:
+    def __init__(self, old, new, key_column, added, removed, status_changed, edited, changed_cells):
+        self.old = old
+        self.new = new
+        self.key_column = key_column
+        self.added = added                    # new-snapshot labels not in the old one
+        self.removed = removed                # old-snapshot labels gone from the new one
+        self.status_changed = status_changed  # new labels whose REMARKS/confirmed/Status or row colour changed
+        self.edited = edited                  # new labels with any other changed cell
+        self.changed_cells = changed_cells    # (new label, column) -> True, as excel_export's red_cells
+
+    def summary(self):
+        return {
+            "old_rows": len(self.old),
+            "new_rows": len(self.new),
+            "added": len(self.added),
+            "removed": len(self.removed),
+            "status_changed": len(self.status_changed),
+            "edited": len(self.edited),
+            "changed_cells": len(self.changed_cells),
+        }
+
+    def changes(self):
+        # Rows of the new snapshot that changed, with what happened to them
+        labels = self.added.union(self.status_changed).union(self.edited)
+        rows = self.new[self.new.index.isin(labels)]
+        change = pd.Series("", index=rows.index, dtype=object)
+        change[rows.index.isin(self.edited)] = EDITED
+        change[rows.index.isin(self.status_changed)] = STATUS
+        change[rows.index.isin(self.added)] = ADDED
+        return rows.assign(**{CHANGE_COLUMN: change})
+
+
+def _differs(old_values, new_values):
+    # Cell-by-cell "did this change", lenient about type: 5 == 5.0 == "5",
+    # blank == NaN == "", text compared after trimming.
+    old_s = pd.Series(old_values, dtype=object)
+    new_s = pd.Series(new_values, dtype=object)
+    old_text = old_s.astype(str).str.strip().to_numpy()
+    new_text = new_s.astype(str).str.strip().to_numpy()
+    old_blank = old_s.isna().to_numpy() | (old_text == "")
+    new_blank = new_s.isna().to_numpy() | (new_text == "")
+
+    differs = old_text != new_text
+    differs[old_blank & new_blank] = False
+    # Only cells whose text differs can still be equal as numbers ("5" vs 5.0)
+    candidates = np.flatnonzero(differs & ~old_blank & ~new_blank)
+    if len(candidates):
+        old_num = pd.to_numeric(old_s.iloc[candidates], errors="coerce").to_numpy(dtype=float)
+        new_num = pd.to_numeric(new_s.iloc[candidates], errors="coerce").to_numpy(dtype=float)
+        differs[candidates[old_num == new_num]] = False
+    differs[old_blank != new_blank] = True
+    return differs
+
+
+def _occurrence_keys(df, key_column):
+    # Normalised serial + occurrence number, so duplicated serials pair up
+    # first-with-first, second-with-second
+    keys = normalise_keys(df[key_column]).reset_index(drop=True)
+    return pd.DataFrame({"key": keys, "n": keys.groupby(keys, sort=False).cumcount(), "pos": np.arange(len(df))})
+
+
+def _rgb(fill):
+    # '#RRGGBB' of a <fill>/<dxf> pattern fill, '' if it has none
+    for tag in ("m:patternFill/m:bgColor", "m:patternFill/m:fgColor"):
+        color = fill.find(tag, _NS) if fill is not None else None
+        if color is not None and color.get("rgb"):
+            return "#" + color.get("rgb")[-6:].upper()
+    return ""
+
+
+def _sheet_path(archive, sheet_name):
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    sheets = workbook.findall("m:sheets/m:sheet", _NS)
+    sheet = sheets[sheet_name] if isinstance(sheet_name, int) else next(s for s in sheets if s.get("name") == sheet_name)
+    rels = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    target = next(r.get("Target") for r in rels if r.get("Id") == sheet.get(_REL))
+    return target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+
+
+def _rows(sqref):
+    # Sheet row numbers covered by "A2:F10 A12:F12"
+    for part in sqref.split():
+        numbers = [int(n) for n in re.findall(r"\d+", part)]
+        yield from range(numbers[0], numbers[-1] + 1)
+
+
+@traced("diff.highlights")
+def read_highlights(source, n_rows, sheet_name=0):
+    # Row colour of each data row of a FINAL sheet, '' where there is none:
+    # from the conditional-format ranges excel_export writes, or from the
+    # first cell's fill in sheets saved with per-cell fills. Only the status
+    # colours (green/blue) count; red edited cells are ignored.
+    data = file_bytes(source)
+    key = (file_digest(data), sheet_name)
+    fills = _highlights.get(key)
+    if fills is not None and len(fills) == n_rows:
+        _highlights.move_to_end(key)
+        return fills
+
+    fills = np.full(n_rows, "", dtype=object)
+    with zipfile.ZipFile(BytesIO(data)) as archive:
+        styles = ElementTree.fromstring(archive.read("xl/styles.xml"))
+        cell_fills = [_rgb(f) for f in styles.findall("m:fills/m:fill", _NS)]
+        xf_fills = [cell_fills[int(xf.get("fillId", 0))] for xf in styles.findall("m:cellXfs/m:xf", _NS)]
+        dxf_fills = [_rgb(d.find("m:fill", _NS)) for d in styles.findall("m:dxfs/m:dxf", _NS)]
+
+        def mark(row, color):
+            if color in STATUS_COLOURS and 0 <= row - 2 < n_rows:
+                fills[row - 2] = color
+
+        with archive.open(_sheet_path(archive, sheet_name)) as sheet:
+            for _, element in ElementTree.iterparse(sheet):
+                tag = element.tag.rsplit("}", 1)[-1]
+                if tag == "row":
+                    first = element.find("m:c", _NS)
+                    if first is not None and first.get("s") and re.match(r"A\d", first.get("r", "A")):
+                        mark(int(element.get("r")), xf_fills[int(first.get("s"))])
+                    element.clear()
+                elif tag == "conditionalFormatting":
+                    for rule in element.findall("m:cfRule", _NS):
+                        if rule.get("dxfId") is not None:
+                            color = dxf_fills[int(rule.get("dxfId"))]
+                            for row in _rows(element.get("sqref", "")):
+                                mark(row, color)
+                    element.clear()
+
+    _highlights[key] = fills
+    while len(_highlights) > MAX_CACHED_HIGHLIGHTS:
+        _highlights.popitem(last=False)
+    return fills
+
+
+def _status_colours(fills, n_rows):
+    if fills is None:
+        return np.full(n_rows, "", dtype=object)
+    fills = np.array([str(f).upper() for f in fills], dtype=object)
+    return np.where(np.isin(fills, STATUS_COLOURS), fills, "")
+
+
+@traced("diff")
+def diff_snapshots(old, new, key_column=KEY_COLUMN, old_fills=None, new_fills=None):
+    # `old_fills`/`new_fills` are per-row colours (see read_highlights,
+    # excel_export.STATUS_FILLS); a matched row whose green/blue highlight
+    # differs counts as a status change. Without them only STATUS_COLUMNS do.
+    old_keys = _occurrence_keys(old, key_column)
+    new_keys = _occurrence_keys(new, key_column)
+    # Rows without a serial can't be matched; they count as removed/added
+    old_keys = old_keys[old_keys["key"] != ""]
+    new_keys = new_keys[new_keys["key"] != ""]
+
+    pairs = old_keys.merge(new_keys, on=["key", "n"], how="inner", suffixes=("_old", "_new"))
+    old_pos = pairs["pos_old"].to_numpy()
+    new_pos = pairs["pos_new"].to_numpy()
+
+    matched_new = np.zeros(len(new), dtype=bool)
+    matched_new[new_pos] = True
+    matched_old = np.zeros(len(old), dtype=bool)
+    matched_old[old_pos] = True
+
+    columns = [c for c in new.columns if c in old.columns and c != key_column]
+    status_rows = np.zeros(len(pairs), dtype=bool)
+    edited_rows = np.zeros(len(pairs), dtype=bool)
+    changed_cells = {}
+    for col in columns:
+        differs = _differs(old[col].to_numpy()[old_pos], new[col].to_numpy()[new_pos])
+        if col in STATUS_COLUMNS:
+            status_rows |= differs
+        else:
+            edited_rows |= differs
+        for label in new.index[new_pos[differs]]:
+            changed_cells[(label, col)] = True
+    if old_fills is not None or new_fills is not None:
+        status_rows |= _status_colours(old_fills, len(old))[old_pos] != _status_colours(new_fills, len(new))[new_pos]
+
+    return SnapshotDiff(
+        old, new, key_column,
+        added=new.index[~matched_new],
+        removed=old.index[~matched_old],
+        status_changed=new.index[new_pos[status_rows]],
+        edited=new.index[new_pos[edited_rows & ~status_rows]],
+        changed_cells=changed_cells,
+    )
+
+
+@traced("diff.report")
+def diff_report(diff, target=None):
+    # Workbook with the changed rows (blue = added, green = status changed,
+    # red = changed cells, as in the FINAL sheet), the removed rows and a
+    # summary. Returns a BytesIO when no target is given.
+    output = target if target is not None else BytesIO()
+    changes = diff.changes()
+    change = changes[CHANGE_COLUMN].to_numpy()
+    fills = np.where(change == ADDED, BLUE, np.where(change == STATUS, GREEN, ""))
+    red = {cell: True for cell in diff.changed_cells if cell[0] in changes.index}
+    summary = pd.DataFrame(list(diff.summary().items()), columns=["metric", "rows"])
+
+    writer = open_writer(output, constant_memory=len(changes) >= CONSTANT_MEMORY_ROWS)
+    write_sheet(writer, summary, sheet_name="Summary")
+    write_sheet(writer, changes, fills, red, sheet_name="Changes")
+    write_sheet(writer, diff.old.loc[diff.removed], sheet_name="Removed")
+    writer.close()
+    if target is None:
+        output.seek(0)
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two inventory snapshots keyed on serial number.")
+    parser.add_argument("old", help="previous master (xlsx)")
+    parser.add_argument("new", help="new snapshot, e.g. a FINAL sheet (xlsx)")
+    parser.add_argument("--key", default=KEY_COLUMN)
+    parser.add_argument("--output", "-o", help="write the colour-coded report here")
+    args = parser.parse_args()
+
+    old, new = load_inventory(args.old), load_inventory(args.new)
+    diff = diff_snapshots(old, new, args.key, read_highlights(args.old, len(old)), read_highlights(args.new, len(new)))
+    for name, count in diff.summary().items():
+        print(f"{name:<16} {count}")
+    if args.output:
+        diff_report(diff, args.output)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import threading
+from io import BytesIO
+
+import pandas as pd
+
+from excel_cache import cache_frame, cached_frame, file_bytes, file_digest, shared_inventory
+from inventory_dtypes import compact_dtypes, normalise_frame
+
+# --- Config ---
+CHUNK_ROWS = 20000
+
+_loads = {}  # digest -> StreamingLoad
+_lock = threading.Lock()
+
+
+def _header(row):
+    # Same names pd.read_excel would give: blanks become "Unnamed: i" and
+    # repeated names get a ".n" suffix.
+    names = []
+    seen = {}
+    for i, value in enumerate(row):
+        name = f"Unnamed: {i}" if value is None else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def iter_chunks(data, sheet_name=None, chunk_rows=CHUNK_ROWS):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(BytesIO(data), read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _header(header)
+        width = len(columns)
+
+        buffer = []
+        for row in rows:
+            row = row[:width]
+            if len(row) < width:
+                row = row + (None,) * (width - len(row))
+            buffer.append(row)
+            if len(buffer) >= chunk_rows:
+                yield compact_dtypes(pd.DataFrame.from_records(buffer, columns=columns))
+                buffer = []
+        if buffer:
+            yield compact_dtypes(pd.DataFrame.from_records(buffer, columns=columns))
+    finally:
+        wb.close()
+
+
+class StreamingLoad:
+    # Parses a workbook chunk by chunk in a background thread. frame() returns
+    # whatever has been loaded so far, so the app can show the first page and
+    # search while the rest of the sheet is still coming in.
+
+    def __init__(self, data, digest, chunk_rows=CHUNK_ROWS):
+        self.digest = digest
+        self.rows_loaded = 0
+        self.done = False
+        self.error = None
+        self._data = data
+        self._chunk_rows = chunk_rows
+        self._frame = None
+        self._pending = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            for chunk in iter_chunks(self._data, chunk_rows=self._chunk_rows):
+                with self._lock:
+                    self._pending.append(chunk)
+                    self.rows_loaded += len(chunk)
+            self.frame()  # fold in the last chunks
+            with self._lock:
+                # Chunks were compacted one at a time; categoricals need
+                # whole columns
+                if self._frame is not None:
+                    self._frame = normalise_frame(self._frame)
+            cache_frame(self.digest, self.frame())
+        except Exception as e:
+            self.error = e
+        finally:
+            self._data = None
+            self.done = True
+
+    def frame(self):
+        with self._lock:
+            if self._pending:
+                # Fold new chunks into one frame as they arrive so peak memory
+                # stays around twice the loaded size, not chunks + copies.
+                parts = [self._frame] if self._frame is not None else []
+                self._frame = pd.concat(parts + self._pending, ignore_index=True)
+                self._pending = []
+            if self._frame is None:
+                return pd.DataFrame()
+            df = self._frame.copy()
+        if self.done and self.error is None:
+            df.attrs["digest"] = self.digest
+        return df
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return self.done
+
+
+def start_streaming_load(uploaded_file, chunk_rows=CHUNK_ROWS):
+    data = file_bytes(uploaded_file)
+    digest = file_digest(data)
+    with _lock:
+        load = _loads.get(digest)
+        if load is not None and not load.done:
+            return load
+        cached = cached_frame(digest)
+        if cached is not None:
+            _loads.pop(digest, None)
+            return _FinishedLoad(digest, cached)
+        if load is None or load.error is not None:
+            load = StreamingLoad(data, digest, chunk_rows)
+            _loads[digest] = load
+        return load
+
+
+class _FinishedLoad:
+    # Stand-in for a workbook that is already in the excel_cache
+
+    def __init__(self, digest, df):
+        self.digest = digest
+        self.rows_loaded = len(df)
+        self.done = True
+        self.error = None
+        self._df = df
+
+    def frame(self):
+        df = shared_inventory(self.digest, 0, lambda: self._df)
+        df.attrs["digest"] = self.digest
+        return df
+
+    def wait(self, timeout=None):
+        return True
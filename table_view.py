@@ -0,0 +1,47 @@
+import math
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from excel_export import row_status
+from profiling import traced
+
+# --- Config ---
+PAGE_SIZE = 100
+MAX_PINNED = 200   # matched rows shown above the pages
+STATUS_CSS = ("", "background-color: lightgreen", "background-color: lightblue")  # by row_status() value
+
+
+def styled(window, status):
+    # Styler for just these rows. The css grid comes from a status array in
+    # one go instead of a Python call per row.
+    css = np.asarray(STATUS_CSS, dtype=object)[status]
+    grid = pd.DataFrame(np.repeat(css[:, None], window.shape[1], axis=1), index=window.index, columns=window.columns)
+    return window.style.apply(lambda _: grid, axis=None).format(na_rep="")
+
+
+def page_count(n_rows, page_size=PAGE_SIZE):
+    return max(1, math.ceil(n_rows / page_size))
+
+
+@traced("style.table")
+def paged_table(df, key, green=None, blue=None, pinned=None, page_size=PAGE_SIZE, **kwargs):
+    # Shows the `pinned` rows (search hits) and one page of df, green/blue
+    # like the FINAL export. Only those rows are styled and sent to the
+    # browser; other pages are sliced when the user turns to them.
+    status = row_status(df, green, blue)
+
+    if pinned is not None and len(pinned):
+        positions = np.flatnonzero(df.index.isin(pinned))
+        shown = positions[:MAX_PINNED]
+        st.dataframe(styled(df.iloc[shown], status[shown]), **kwargs)
+        if len(positions) > len(shown):
+            st.caption(f"Showing the first {len(shown)} of {len(positions)} matching rows.")
+
+    pages = page_count(len(df), page_size)
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page")
+    start = (int(page) - 1) * page_size
+    stop = min(start + page_size, len(df))
+    st.dataframe(styled(df.iloc[start:stop], status[start:stop]), **kwargs)
+    st.caption(f"Rows {start + 1}-{stop} of {len(df)}")
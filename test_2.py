@@ -1,17 +1,15 @@
 import streamlit as st
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-import pandas as pd
+from sheets_client import get_sheet_mirror
+from sheets_queue import get_append_queue
+import profiling
+
+profiling.start_rerun("test_2")  # no-op unless INVENTORY_PROFILE=1
 
 # --- Setup Google Sheets access ---
 def get_sheet_data(sheet_url, creds_path):
-    scope = ["https://spreadsheets.google.com/feeds",
-             "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name(creds_path, scope)
-    client = gspread.authorize(creds)
-    sheet = client.open_by_url(sheet_url).sheet1
-    data = sheet.get_all_records()
-    return pd.DataFrame(data), sheet
+    # Pooled client + local mirror; reruns only hit the API when the sheet changed
+    mirror = get_sheet_mirror(sheet_url, creds_path)
+    return mirror.frame(), mirror
 
 # --- Streamlit App ---
 st.title("📊 Google Sheets Viewer & Editor")
@@ -22,9 +20,10 @@ creds_path = r"C:\Users\MAINTENANCE\Downloads\client_secret_297568253721-l65cjuo
 
 if sheet_url and creds_path:
     try:
-        df, sheet = get_sheet_data(sheet_url, creds_path)
+        df, mirror = get_sheet_data(sheet_url, creds_path)
         st.success("Sheet loaded successfully!")
         st.dataframe(df)
+        queue = get_append_queue(mirror)
 
         # Optional: Add a row
         with st.form("Add new row"):
@@ -33,25 +32,26 @@ if sheet_url and creds_path:
                 new_data[col] = st.text_input(f"{col}")
             submitted = st.form_submit_button("Add Row")
             if submitted:
-                sheet.append_row(list(new_data.values()))
+                # Journaled locally and sent in batches by a background worker
+                queue.put(list(new_data.values()))
                 st.success("Row added!")
 
+        if queue.pending():
+            st.caption(f"⏳ {queue.pending()} row(s) waiting to upload")
+        if queue.last_error:
+            st.warning(f"Upload retrying: {queue.last_error}")
+
     except Exception as e:
         st.error(f"Error: {e}")
 import streamlit as st
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-import pandas as pd
+from sheets_client import get_sheet_mirror
+from sheets_queue import get_append_queue
 
 # --- Setup Google Sheets access ---
 def get_sheet_data(sheet_url, creds_path):
-    scope = ["https://spreadsheets.google.com/feeds",
-             "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name(creds_path, scope)
-    client = gspread.authorize(creds)
-    sheet = client.open_by_url(sheet_url).sheet1
-    data = sheet.get_all_records()
-    return pd.DataFrame(data), sheet
+    # Pooled client + local mirror; reruns only hit the API when the sheet changed
+    mirror = get_sheet_mirror(sheet_url, creds_path)
+    return mirror.frame(), mirror
 
 # --- Streamlit App ---
 st.title("📊 Google Sheets Viewer & Editor")
@@ -62,9 +62,10 @@ creds_path = st.text_input("Path to credentials JSON file", type="password")
 
 if sheet_url and creds_path:
     try:
-        df, sheet = get_sheet_data(sheet_url, creds_path)
+        df, mirror = get_sheet_data(sheet_url, creds_path)
         st.success("Sheet loaded successfully!")
         st.dataframe(df)
+        queue = get_append_queue(mirror)
 
         # Optional: Add a row
         with st.form("Add new row"):
@@ -73,8 +74,16 @@ if sheet_url and creds_path:
                 new_data[col] = st.text_input(f"{col}")
             submitted = st.form_submit_button("Add Row")
             if submitted:
-                sheet.append_row(list(new_data.values()))
+                # Journaled locally and sent in batches by a background worker
+                queue.put(list(new_data.values()))
                 st.success("Row added!")
 
+        if queue.pending():
+            st.caption(f"⏳ {queue.pending()} row(s) waiting to upload")
+        if queue.last_error:
+            st.warning(f"Upload retrying: {queue.last_error}")
+
     except Exception as e:
         st.error(f"Error: {e}")
+
+profiling.panel()
@@ -1,6 +1,13 @@
 import streamlit as st
 import pandas as pd
 from io import BytesIO
+from excel_cache import load_inventory
+from search_index import contains_match
+from inventory_query import query_panel
+from table_view import paged_table
+import profiling
+
+profiling.start_rerun("test_3")  # no-op unless INVENTORY_PROFILE=1
 
 # --- App Title ---
 st.title("📦 Inventory Management System")
@@ -9,24 +16,22 @@ st.title("📦 Inventory Management System")
 uploaded_file = st.file_uploader("Upload Inventory Excel File", type=["xlsx"])
 
 if uploaded_file:
-    df = pd.read_excel(uploaded_file)
+    df = load_inventory(uploaded_file)
+
+    # Several conditions at once (Status = Pending AND Quantity < 10 ...)
+    query_panel(df, "filter")
 
     st.subheader("🔍 Search / Check Machine")
     search_col = st.selectbox("Search by column", df.columns)
     search_val = st.text_input("Enter search value")
 
     # Track whether match is found
-    matched_rows = df[df[search_col].astype(str).str.contains(search_val, case=False, na=False)]
+    matched_rows = df.loc[contains_match(df, search_col, search_val)]
 
     if not matched_rows.empty:
         st.success(f"✅ Found {len(matched_rows)} matching rows.")
 
-        def highlight_row_green(row):
-            if row.name in matched_rows.index:
-                return ['background-color: lightgreen'] * len(row)
-            return [''] * len(row)
-
-        st.dataframe(df.style.apply(highlight_row_green, axis=1))
+        paged_table(df, "matched", green=matched_rows.index, pinned=matched_rows.index if search_val else None)
 
     else:
         st.warning("🔎 No match found. This seems like a new machine.")
@@ -42,16 +47,14 @@ if uploaded_file:
             df.at[len(df)-1, 'REMARKS'] = "New entry added"
             st.success("✅ New machine added successfully.")
 
-        def highlight_row_blue(row):
-            if row.name == len(df) - 1 and row['REMARKS'] == "New entry added":
-                return ['background-color: lightblue'] * len(row)
-            return [''] * len(row)
-
-        st.dataframe(df.style.apply(highlight_row_blue, axis=1))
+        is_new = (df.index == len(df) - 1) & (df.get('REMARKS', pd.Series("", index=df.index)) == "New entry added")
+        paged_table(df, "inventory", blue=is_new)
 
         # Download updated Excel
         buffer = BytesIO()
-        df.to_excel(buffer, index=False)
+        with profiling.span("export.to_excel"):
+            df.to_excel(buffer, index=False)
         buffer.seek(0)
         st.download_button("📥 Download Updated Excel", buffer, file_name="updated_inventory.xlsx")
 
+profiling.panel()
@@ -1,7 +1,16 @@
 import streamlit as st
 import pandas as pd
-from io import BytesIO
 import os
+from excel_cache import load_inventory
+from search_index import contains_match
+from inventory_query import query_panel
+from final_export import download_panel
+from table_view import paged_table
+from snapshot_diff import diff_snapshots, diff_report, read_highlights
+from excel_export import STATUS_FILLS, row_status
+import profiling
+
+profiling.start_rerun("test_4")  # no-op unless INVENTORY_PROFILE=1
 
 st.set_page_config(page_title="Inventory Manager", layout="wide")
 st.title("📦 Inventory Management Web App")
@@ -11,14 +20,16 @@ uploaded_file = st.file_uploader("Upload your inventory Excel file", type=["xlsx
 
 if uploaded_file:
     original_filename = os.path.splitext(uploaded_file.name)[0]
-    df = pd.read_excel(uploaded_file)
-    df = df.fillna("")
+    df = load_inventory(uploaded_file)
+
+    # Several conditions at once (Status = Pending AND Quantity < 10 ...)
+    query_panel(df, "filter")
 
     st.subheader("🔍 Search or Add Machine")
     search_column = st.selectbox("Select column to search", df.columns)
     search_value = st.text_input("Enter value to search")
 
-    matched_indices = df[df[search_column].astype(str).str.contains(search_value, case=False)].index.tolist()
+    matched_indices = contains_match(df, search_column, search_value).tolist()
 
     # Add new entry if no match
     if search_value and not matched_indices:
@@ -35,52 +46,46 @@ if uploaded_file:
             matched_indices.append(len(df) - 1)
             st.success("✅ New machine added.")
 
-    # Style rows (green for matched, blue for new)
-    def apply_color(row):
-        if row.name in matched_indices:
-            if row.get("REMARKS", "") == "New entry added":
-                return ['background-color: lightblue'] * len(row)
-            else:
-                return ['background-color: lightgreen'] * len(row)
-        return [''] * len(row)
+    # Row colours (green for matched, blue for new), shared by the table and the export
+    matched = df.index.isin(matched_indices)
+    is_new = df.get("REMARKS", pd.Series("", index=df.index)) == "New entry added"
 
     st.subheader("📋 Inventory Table")
-    st.dataframe(df.style.apply(apply_color, axis=1), use_container_width=True)
+    paged_table(df, "inventory", green=matched & ~is_new, blue=matched & is_new,
+                pinned=matched_indices if search_value else None, use_container_width=True)
 
     # Show non-highlighted rows
     st.subheader("👀 View Non-highlighted Machines")
-    non_highlighted_df = df.drop(index=matched_indices)
-    st.dataframe(non_highlighted_df, use_container_width=True)
-
-    # Save Excel with colors
-    output = BytesIO()
-    writer = pd.ExcelWriter(output, engine='xlsxwriter')
-    df.to_excel(writer, index=False, sheet_name='Inventory')
-    workbook = writer.book
-    worksheet = writer.sheets['Inventory']
-
-    # Apply colors in Excel
-    green_format = workbook.add_format({'bg_color': '#C6EFCE'})
-    blue_format = workbook.add_format({'bg_color': '#ADD8E6'})
-
-    for i, row in df.iterrows():
-        fmt = None
-        if i in matched_indices:
-            if row.get("REMARKS", "") == "New entry added":
-                fmt = blue_format
-            else:
-                fmt = green_format
-        if fmt:
-            worksheet.set_row(i + 1, None, fmt)  # +1 to skip header
-
-    writer.close()
-    output.seek(0)
-
-    # Download button
-    final_filename = f"FINAL {original_filename}.xlsx"
-    st.download_button(
-        label="💾 Download FINAL Excel Sheet",
-        data=output,
-        file_name=final_filename,
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    non_highlighted_df = df[~matched]
+    paged_table(non_highlighted_df, "unhighlighted", use_container_width=True)
+
+    # FINAL sheet with colors (green for matched, blue for new), built on request
+    st.subheader("💾 Download FINAL Sheet")
+    download_panel(df, f"FINAL {original_filename}", "final", green=matched & ~is_new, blue=matched & is_new)
+
+    # Compare against the previous master
+    with st.expander("🆚 Compare with Previous Master"):
+        master_file = st.file_uploader("Upload the previous master Excel file", type=["xlsx"], key="master")
+        key_options = df.columns.tolist()
+        key_col = st.selectbox("Match rows on", key_options,
+                               index=key_options.index("Serial Number") if "Serial Number" in key_options else 0)
+        if master_file:
+            # Matches are only row colours here, so compare those as well
+            master = load_inventory(master_file)
+            diff = diff_snapshots(master, df, key_col, read_highlights(master_file, len(master)),
+                                  STATUS_FILLS[row_status(df, matched & ~is_new, matched & is_new)])
+            summary = diff.summary()
+            st.write(
+                f"➕ {summary['added']} added, ➖ {summary['removed']} removed, "
+                f"✅ {summary['status_changed']} status changed, ✏️ {summary['edited']} edited "
+                f"({summary['changed_cells']} changed cells)"
+            )
+            paged_table(diff.changes(), "diff", green=diff.status_changed, blue=diff.added, use_container_width=True)
+            st.download_button(
+                label="📑 Download Diff Report",
+                data=diff_report(diff),
+                file_name=f"DIFF {original_filename}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+
+profiling.panel()
@@ -1,7 +1,16 @@
 import streamlit as st
 import pandas as pd
-from io import BytesIO
 import os
+import uuid
+from excel_cache import file_bytes, file_digest, load_inventory
+from edit_journal import WorkingCopy
+from search_index import exact_match, fuzzy_match
+from final_export import download_panel
+from inventory_summary import summary_panel
+from integrity_index import integrity_panel, show_conflicts
+import profiling
+
+profiling.start_rerun("test_5")  # no-op unless INVENTORY_PROFILE=1
 
 st.set_page_config("Inventory Manager", layout="wide")
 st.title("📦 Inventory Manager with Confirmation & Edits")
@@ -11,11 +20,34 @@ uploaded_file = st.file_uploader("Upload your inventory Excel file", type=["xlsx
 
 if uploaded_file:
     original_filename = os.path.splitext(uploaded_file.name)[0]
-    df = pd.read_excel(uploaded_file)
-    df = df.fillna("")
-    st.session_state.setdefault("confirmed_rows", set())
-    st.session_state.setdefault("new_rows", set())
-    st.session_state.setdefault("edited_cells", {})
+    digest = file_digest(file_bytes(uploaded_file))
+    wc = st.session_state.get("working_copy")
+    if wc is None or wc.digest != digest:
+        # Loaded once per upload; earlier edits to it come back from this
+        # session's journal. The session id lives in the URL, so a reload
+        # (or a server restart) finds the same journal again.
+        if wc is not None:
+            wc.close()
+        if "session" not in st.query_params:
+            st.query_params["session"] = uuid.uuid4().hex
+        wc = WorkingCopy(load_inventory(uploaded_file), digest, st.query_params["session"])
+        st.session_state.working_copy = wc
+    df = wc.df
+    # Filled in at the end of the script, so it includes this rerun's changes
+    summary_slot = st.container()
+
+    # UNDO / REDO
+    undo_col, redo_col, discard_col = st.columns(3)
+    if undo_col.button("↩️ Undo", disabled=not wc.can_undo()):
+        wc.undo()
+        st.rerun()
+    if redo_col.button("↪️ Redo", disabled=not wc.can_redo()):
+        wc.redo()
+        st.rerun()
+    if discard_col.button("🗑️ Discard All Changes"):
+        wc.discard()
+        del st.session_state.working_copy
+        st.rerun()
 
     # SEARCH SECTION
     st.subheader("🔍 Search for Machine")
@@ -27,10 +59,14 @@ if uploaded_file:
     match_df = pd.DataFrame()
 
     if search_btn and val_to_search:
-        match_df = df[df[col_to_search].astype(str).str.lower() == val_to_search.lower()]
+        match_df = df.loc[exact_match(df, col_to_search, val_to_search)]
         match_indices = match_df.index.tolist()
         if match_df.empty:
             st.warning("No match found.")
+            near = fuzzy_match(df, col_to_search, val_to_search)
+            if not near.empty:
+                st.info("Did you mean one of these?")
+                st.dataframe(df.loc[near.index].assign(edits=near))
         else:
             st.success(f"Found {len(match_df)} match(es)")
             st.dataframe(match_df)
@@ -38,23 +74,28 @@ if uploaded_file:
     # CONFIRM MATCH
     if match_indices:
         selected_index = match_indices[0]
+        show_conflicts(wc.integrity.check_confirm(match_indices))
         confirm_btn = st.button("✅ Confirm Match")
 
         if confirm_btn:
-            st.session_state.confirmed_rows.add(selected_index)
+            wc.confirm(selected_index)
             st.success("Confirmed. Row will be marked green in final sheet.")
 
         # EDIT MATCHED ROW
         st.subheader("✏️ Edit This Equipment")
         edited = False
         for col in df.columns:
-            new_val = st.text_input(f"{col}", value=str(df.at[selected_index, col]), key=f"{col}_edit")
-            if new_val != str(df.at[selected_index, col]):
-                df.at[selected_index, col] = new_val
-                st.session_state.edited_cells[(selected_index, col)] = True
+            current = df.at[selected_index, col]
+            current = "" if pd.isna(current) else str(current)
+            new_val = st.text_input(f"{col}", value=current, key=f"{col}_edit")
+            if new_val != current:
+                wc.set_cell(selected_index, col, new_val)
                 edited = True
+                if col == wc.integrity.key_column:
+                    show_conflicts(wc.integrity.check_add(new_val, row=selected_index))
 
         if edited:
+            df = wc.df
             st.info("Changes saved. Edited cells will be highlighted red.")
 
     # ADD NEW ROW
@@ -64,44 +105,31 @@ if uploaded_file:
         new_data[col] = st.text_input(f"New {col}", key=f"new_{col}")
 
     if st.button("➕ Add Machine"):
-        df.loc[len(df)] = new_data
-        df.at[len(df)-1, 'REMARKS'] = "New entry added"
-        st.session_state.new_rows.add(len(df)-1)
+        show_conflicts(wc.integrity.check_add(new_data.get(wc.integrity.key_column)))
+        wc.add_row(new_data)
+        df = wc.df
         st.success("New machine added.")
 
     # SHOW UNMARKED ROWS
     st.subheader("👀 Unmarked (Not Confirmed/New) Machines")
-    other_rows = df[~df.index.isin(st.session_state.confirmed_rows.union(st.session_state.new_rows))]
+    other_rows = df[~df.index.isin(wc.confirmed | wc.new_rows)]
     st.dataframe(other_rows, use_container_width=True)
 
-    # SAVE FINAL EXCEL
-    output = BytesIO()
-    writer = pd.ExcelWriter(output, engine='xlsxwriter')
-    df.to_excel(writer, index=False, sheet_name='Inventory')
-    workbook = writer.book
-    worksheet = writer.sheets['Inventory']
-
-    green_fmt = workbook.add_format({'bg_color': '#C6EFCE'})
-    blue_fmt = workbook.add_format({'bg_color': '#ADD8E6'})
-    red_fmt = workbook.add_format({'bg_color': '#FFC7CE'})
-
-    for i, row in df.iterrows():
-        fmt_row = None
-        if i in st.session_state.confirmed_rows:
-            fmt_row = green_fmt
-        elif i in st.session_state.new_rows:
-            fmt_row = blue_fmt
-
-        if fmt_row:
-            worksheet.set_row(i + 1, None, fmt_row)
-
-        # Highlight edited cells
-        for j, col in enumerate(df.columns):
-            if (i, col) in st.session_state.edited_cells:
-                worksheet.write(i + 1, j, row[col], red_fmt)
-
-    writer.close()
-    output.seek(0)
-
-    final_name = f"FINAL {original_filename}.xlsx"
-    st.download_button("💾 Download FINAL Sheet", output, file_name=final_name)
+    # SAVE FINAL EXCEL (built on request; the working copy's version says when it is stale)
+    st.subheader("💾 Download FINAL Sheet")
+    download_panel(
+        df,
+        f"FINAL {original_filename}",
+        "final",
+        green=wc.confirmed,
+        blue=wc.new_rows,
+        red_cells=wc.edited,
+        version=df.attrs.get("digest"),
+    )
+
+    # STOCK-TAKE SUMMARY and serial problems (kept up to date by the working copy, no rescans)
+    with summary_slot:
+        summary_panel(wc.summary)
+        integrity_panel(wc.integrity)
+
+profiling.panel()
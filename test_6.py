@@ -1,6 +1,12 @@
 import streamlit as st
 import pandas as pd
 import io
+from excel_cache import load_inventory
+from search_index import exact_match, fuzzy_match
+from integrity_index import integrity_for, integrity_panel, show_conflicts
+import profiling
+
+profiling.start_rerun("test_6")  # no-op unless INVENTORY_PROFILE=1
 
 st.title("📦 Inventory Management Thingi")
 
@@ -8,7 +14,7 @@ st.title("📦 Inventory Management Thingi")
 uploaded_file = st.file_uploader("Upload your inventory Excel file", type=["xlsx"])
 
 if uploaded_file:
-    df = pd.read_excel(uploaded_file)
+    df = load_inventory(uploaded_file)
 
     # Drop 'unknown' column if it exists
     if 'unknown' in df.columns:
@@ -18,6 +24,10 @@ if uploaded_file:
     if 'confirmed' not in df.columns:
         df['confirmed'] = ""
 
+    # Duplicate/blank serials, found once per upload
+    integrity = integrity_for(df)
+    integrity_panel(integrity)
+
     # Search column selector
     search_column = st.selectbox("Search by column", options=df.columns[df.columns != 'confirmed'])
 
@@ -26,29 +36,37 @@ if uploaded_file:
 
     if search_value:
         # Filter the DataFrame
-        filtered_df = df[df[search_column].astype(str).str.lower() == search_value.lower()]
+        filtered_df = df.loc[exact_match(df, search_column, search_value)]
 
         if not filtered_df.empty:
             st.write("✅ Match found:")
             st.dataframe(filtered_df)
+            show_conflicts(integrity.check_confirm(filtered_df.index))
 
             if st.button("Confirm"):
                 # Update the 'confirmed' column for matched rows
-                df.loc[df[search_column].astype(str).str.lower() == search_value.lower(), 'confirmed'] = "Y"
+                df.loc[filtered_df.index, 'confirmed'] = "Y"
                 st.success("✔️ Entry confirmed.")
         else:
             st.warning("⚠️ No match found.")
+            near = fuzzy_match(df, search_column, search_value)
+            if not near.empty:
+                st.info("🔎 Did you mean one of these?")
+                st.dataframe(df.loc[near.index].assign(edits=near))
 
             if st.button("Add New Entry"):
                 # Create a new row with the search value and 'B' in confirmed
                 new_row = {col: "" for col in df.columns}
                 new_row[search_column] = search_value
                 new_row["confirmed"] = "B"
+                show_conflicts(integrity.check_add(new_row.get(integrity.key_column)))
                 df = df.append(new_row, ignore_index=True)
                 st.success("➕ New entry added with 'B' confirmation.")
 
     # Save modified Excel
     output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+    with profiling.span("export.to_excel"), pd.ExcelWriter(output, engine='xlsxwriter') as writer:
         df.to_excel(writer, index=False)
     st.download_button("💾 Download updated Excel file", output.getvalue(), "updated_inventory.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+profiling.panel()
@@ -1,6 +1,14 @@
 import streamlit as st
 import pandas as pd
-from io import BytesIO
+from excel_cache import load_inventory
+from search_index import contains_match
+from integrity_index import integrity_for, integrity_panel, show_conflicts
+from inventory_query import query_panel
+from table_view import paged_table
+from final_export import download_panel
+import profiling
+
+profiling.start_rerun("test_8")  # no-op unless INVENTORY_PROFILE=1
 
 st.set_page_config(page_title="Inventory Management", layout="wide")
 
@@ -11,28 +19,34 @@ st.title("📦 Inventory Management System")
 uploaded_file = st.file_uploader("📤 Upload Inventory Excel File", type=["xlsx"])
 
 if uploaded_file:
-    df = pd.read_excel(uploaded_file)
+    df = load_inventory(uploaded_file)
 
     # Ensure REMARKS column exists
     if 'REMARKS' not in df.columns:
         df['REMARKS'] = ""
 
+    # Several conditions at once (Status = Pending AND Quantity < 10 ...)
+    query_panel(df, "filter")
+
+    # Duplicate/blank serials, found once per upload
+    integrity = integrity_for(df)
+    integrity_panel(integrity)
+
     st.subheader("🔍 Search / Check Machine")
     search_col = st.selectbox("Search by column", df.columns)
     search_val = st.text_input("Enter search value")
 
     # Filter for matching rows
-    matched_rows = df[df[search_col].astype(str).str.contains(search_val, case=False, na=False)]
+    matched_rows = df.loc[contains_match(df, search_col, search_val)]
 
     if not matched_rows.empty:
         st.success(f"✅ Found {len(matched_rows)} matching row(s).")
 
-        def highlight_row_green(row):
-            if row.name in matched_rows.index:
-                return ['background-color: lightgreen'] * len(row)
-            return [''] * len(row)
+        paged_table(df, "matched", green=matched_rows.index, pinned=matched_rows.index if search_val else None,
+                    use_container_width=True)
 
-        st.dataframe(df.style.apply(highlight_row_green, axis=1), use_container_width=True)
+        # Every hit gets confirmed; say so when that means shared or several serials
+        show_conflicts(integrity.check_confirm(matched_rows.index))
 
         if st.button("✔️ Confirm Entry"):
             df.loc[matched_rows.index, 'REMARKS'] = "Confirmed"
@@ -51,25 +65,16 @@ if uploaded_file:
                 new_row[col] = cols[i % len(cols)].text_input(f"{col}", key=col)
 
         if st.button("➕ Add New Machine"):
+            show_conflicts(integrity.check_add(new_row.get(integrity.key_column)))
             new_row["REMARKS"] = "New entry added"
             df.loc[len(df)] = new_row
             st.success("✅ New machine added successfully.")
 
-        def highlight_row_blue(row):
-            if row.name == len(df) - 1 and row['REMARKS'] == "New entry added":
-                return ['background-color: lightblue'] * len(row)
-            return [''] * len(row)
-
-        st.dataframe(df.style.apply(highlight_row_blue, axis=1), use_container_width=True)
+        is_new = (df.index == len(df) - 1) & (df.get('REMARKS', pd.Series("", index=df.index)) == "New entry added")
+        paged_table(df, "inventory", blue=is_new, use_container_width=True)
 
-    # --- Download updated Excel ---
-    buffer = BytesIO()
-    df.to_excel(buffer, index=False)
-    buffer.seek(0)
+    # --- Download updated Excel (built on request) ---
+    st.subheader("📥 Download Updated Inventory")
+    download_panel(df, "updated_inventory", "updated")
 
-    st.download_button(
-        "📥 Download Updated Excel",
-        buffer,
-        file_name="updated_inventory.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+profiling.panel()
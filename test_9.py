@@ -1,14 +1,52 @@
 import streamlit as st
-import pandas as pd
-from io import BytesIO
+import time
+from workbook_loader import SHEET_COLUMN, SOURCE_COLUMN, load_workbooks
+from search_index import contains_match
+from integrity_index import integrity_for, integrity_panel, show_conflicts
+from inventory_query import query_panel
+from streaming_ingest import start_streaming_load
+from reconcile import read_scan_list, reconcile
+from excel_cache import file_bytes, file_digest
+from final_export import download_panel
+import profiling
+
+profiling.start_rerun("test_9")  # no-op unless INVENTORY_PROFILE=1
 
 st.set_page_config(page_title="Inventory Management", layout="wide")
 st.title("📦 Inventory Management System")
 
-uploaded_file = st.file_uploader("📤 Upload Inventory Excel File", type=["xlsx"])
+uploaded_files = st.file_uploader("📤 Upload Inventory Excel File(s)", type=["xlsx"], accept_multiple_files=True)
+streaming = st.sidebar.checkbox("⚡ Streaming load (one very large workbook, first sheet)")
+
+if uploaded_files:
+    loading = None
+    if streaming:
+        loading = start_streaming_load(uploaded_files[0])
+        if loading.error:
+            st.error(f"Error: {loading.error}")
+            st.stop()
+        df = loading.frame()
+        if not loading.done:
+            st.info(f"⏳ Loading workbook... {loading.rows_loaded} rows so far. Search covers the loaded rows.")
+            if df.columns.empty:
+                time.sleep(0.5)
+                st.rerun()
+    else:
+        # Every sheet of every file, parsed in parallel and merged into one frame
+        df = load_workbooks(uploaded_files)
+        if SOURCE_COLUMN in df.columns:
+            n_sheets = len(df[[SOURCE_COLUMN, SHEET_COLUMN]].drop_duplicates())
+            st.caption(f"📚 {len(df)} rows from {n_sheets} sheet(s) in {len(uploaded_files)} file(s)")
 
-if uploaded_file:
-    df = pd.read_excel(uploaded_file)
+    # A reconciled inventory outlives the rerun its button was pressed in, for
+    # as long as the same workbook(s) and scan file are uploaded
+    scan_file = st.session_state.get("reconcile_scan")
+    reconciled = st.session_state.get("reconciled")
+    upload_digest = df.attrs.get("digest")
+    if reconciled is not None and scan_file is not None and upload_digest is not None \
+            and reconciled[0] == (upload_digest, file_digest(file_bytes(scan_file))):
+        df = reconciled[1].copy(deep=False)  # confirms below don't write into the kept frame
+        st.caption("📋 Showing the inventory reconciled with the scanned list.")
 
     # Ensure 'REMARKS' and 'confirmed' columns exist
     if 'REMARKS' not in df.columns:
@@ -16,16 +54,25 @@ if uploaded_file:
     if 'confirmed' not in df.columns:
         df['confirmed'] = ""
 
+    # Several conditions at once (Status = Pending AND Quantity < 10 ...)
+    query_panel(df, "filter")
+
+    # Duplicate/blank serials, found once the whole workbook is in
+    if loading is None or loading.done:
+        integrity_panel(integrity_for(df))
+
     st.subheader("🔍 Search / Check Machine")
     search_col = st.selectbox("Search by column", df.columns[df.columns != 'confirmed'])
     search_val = st.text_input("Enter search value")
 
-    matched_rows = df[df[search_col].astype(str).str.contains(search_val, case=False, na=False)]
+    matched_rows = df.loc[contains_match(df, search_col, search_val)]
 
     if not matched_rows.empty:
         st.success(f"✅ Found {len(matched_rows)} matching row(s).")
         st.subheader("ℹ️ Details of Found Items")
         st.dataframe(matched_rows, use_container_width=True)
+        # Every hit gets confirmed; say so when that means shared or several serials
+        show_conflicts(integrity_for(df).check_confirm(matched_rows.index))
 
         if st.button("✔️ Confirm These Entries"):
             df.loc[matched_rows.index, 'REMARKS'] = "Confirmed"
@@ -43,19 +90,42 @@ if uploaded_file:
                 new_row[col] = cols[i % len(cols)].text_input(f"{col}", key=col)
 
         if st.button("➕ Add New Machine"):
+            integrity = integrity_for(df)
+            show_conflicts(integrity.check_add(new_row.get(integrity.key_column)))
             new_row["REMARKS"] = "New entry added"
             new_row["confirmed"] = "B"
             df.loc[len(df)] = new_row
             st.success("✅ New machine added with 'B' confirmation.")
 
-    # --- Download Updated Excel ---
-    buffer = BytesIO()
-    df.to_excel(buffer, index=False)
-    buffer.seek(0)
-
-    st.download_button(
-        "📥 Download Updated Excel",
-        buffer,
-        file_name="updated_inventory.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    # --- Bulk Reconcile a Scanned List ---
+    with st.expander("📋 Bulk Reconcile Scanned List"):
+        scan_file = st.file_uploader("Upload scanned serials (CSV, or text with one per line)", type=["csv", "txt"],
+                                     key="reconcile_scan")
+        key_col = st.selectbox("Serial number column", df.columns[~df.columns.isin(['REMARKS', 'confirmed'])], key="reconcile_col")
+
+        if scan_file and st.button("🔄 Reconcile"):
+            result = reconcile(df, read_scan_list(scan_file, key_col), key_col)
+            df = result.df
+            if upload_digest is not None:
+                scan_digest = file_digest(file_bytes(scan_file))
+                df.attrs["digest"] = f"{upload_digest}-reconciled-{scan_digest}"  # its own search/integrity indexes
+                st.session_state["reconciled"] = (upload_digest, scan_digest), df
+            summary = result.summary()
+            st.success(f"✅ {summary['confirmed']} confirmed, ➕ {summary['added']} added with 'B' confirmation.")
+            if summary['duplicate_scans']:
+                st.warning(f"⚠️ {summary['duplicate_scans']} serial(s) were scanned more than once.")
+                st.dataframe(result.duplicate_scans.rename("times scanned"))
+            if summary['duplicate_rows']:
+                st.warning(f"⚠️ {summary['duplicate_rows']} confirmed row(s) share a serial with another row.")
+                st.dataframe(df.loc[result.duplicate_rows], use_container_width=True)
+
+    # --- Download Updated Excel (built on request) ---
+    st.subheader("📥 Download Updated Inventory")
+    download_panel(df, "updated_inventory", "updated")
+
+    profiling.panel()
+
+    # Keep polling until the streaming load has the whole sheet
+    if loading is not None and not loading.done:
+        time.sleep(1)
+        st.rerun()
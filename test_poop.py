@@ -1,39 +1,76 @@
 import streamlit as st
 import pandas as pd
 import os
-from io import BytesIO
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
-from streamlit_webrtc import webrtc_streamer
+import json
+from excel_export import row_fills, write_highlighted_excel
+from final_export import download_panel
+from inventory_db import InventoryDB
+from search_index import fuzzy_match
+import profiling
+
+profiling.start_rerun("test_poop")  # no-op unless INVENTORY_PROFILE=1
 
 # Config
 EXCEL_FILE = 'inventory.xlsx'
 SHEET_NAME = 'Sheet1'
+COLORS_FILE = 'inventory.colors.json'  # row index -> fill colour
+DB_FILE = 'inventory.db'  # live store; the Excel file is only imported/exported
+SCAN_POLL_SECONDS = 0.5
+
+# Starter inventory for a fresh install (no workbook, no store yet)
+DUMMY_DATA = {
+    "Serial Number": ["SN001", "SN002", "SN003", "SN004"],
+    "Product Name": ["Widget A", "Widget B", "Widget C", "Widget D"],
+    "Quantity": [10, 20, 15, 5],
+    "Status": ["Pending", "Pending", "Confirmed", "Pending"]
+}
 
-# Create dummy Excel if not exists
-if not os.path.exists(EXCEL_FILE):
-    dummy_data = {
-        "Serial Number": ["SN001", "SN002", "SN003", "SN004"],
-        "Product Name": ["Widget A", "Widget B", "Widget C", "Widget D"],
-        "Quantity": [10, 20, 15, 5],
-        "Status": ["Pending", "Pending", "Confirmed", "Pending"]
-    }
-    dummy_df = pd.DataFrame(dummy_data)
-    dummy_df.to_excel(EXCEL_FILE, index=False)
-
-@st.cache_data
-def load_excel():
-    return pd.read_excel(EXCEL_FILE, sheet_name=SHEET_NAME)
-
-def save_excel(df, color_map):
-    df.to_excel(EXCEL_FILE, sheet_name=SHEET_NAME, index=False)
-    wb = load_workbook(EXCEL_FILE)
+def read_fills_from_workbook():
+    # One-off migration for files saved before the colours sidecar existed
+    from openpyxl import load_workbook
+
+    colors = {}
+    wb = load_workbook(EXCEL_FILE, read_only=True)
     ws = wb[SHEET_NAME]
-    for row_idx, color in color_map.items():
-        fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
-        for cell in ws[row_idx + 2]:
-            cell.fill = fill
-    wb.save(EXCEL_FILE)
+    for row_idx, row in enumerate(ws.iter_rows(min_row=2, max_col=1)):
+        fill = row[0].fill if row else None
+        if fill is not None and fill.fill_type == "solid":
+            colors[row_idx] = str(fill.start_color.rgb)[-6:]
+    wb.close()
+    return colors
+
+def load_color_map():
+    if os.path.exists(COLORS_FILE):
+        with open(COLORS_FILE) as f:
+            return {int(k): v for k, v in json.load(f).items()}
+    return read_fills_from_workbook()
+
+@st.cache_resource
+def get_db():
+    db = InventoryDB(DB_FILE)
+    if not db.exists():
+        if os.path.exists(EXCEL_FILE):
+            db.import_excel(EXCEL_FILE, SHEET_NAME, load_color_map())
+        else:
+            # Seed the store directly instead of writing and re-parsing a workbook
+            db.import_frame(pd.DataFrame(DUMMY_DATA))
+    return db
+
+@st.cache_data(max_entries=2)
+def load_inventory_frame(version):
+    # Keyed by the store's write counter, so every session sees the latest rows
+    df = get_db().read_frame()
+    df.attrs["digest"] = f"db-{version}"  # search index cache key
+    return df
+
+def save_excel(db):
+    # Export the live store back to EXCEL_FILE, data and fills in one pass
+    df, colors = db.read_frame(with_colors=True)
+    tmp_file = os.path.join(os.path.dirname(EXCEL_FILE), "~" + os.path.basename(EXCEL_FILE))
+    write_highlighted_excel(tmp_file, df, row_fills(len(df), dict(enumerate(colors))), sheet_name=SHEET_NAME)
+    os.replace(tmp_file, EXCEL_FILE)
+    with open(COLORS_FILE, "w") as f:
+        json.dump({str(i): c for i, c in enumerate(colors) if c}, f)
 
 # Page config
 st.set_page_config(page_title="Blank Inventory Management System", layout="wide")
@@ -44,23 +81,59 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# Load Excel data
-df = load_excel()
+# Load inventory data
+db = get_db()
+df = load_inventory_frame(db.version())
+
+# Camera section. webrtc and OpenCV are only imported once the camera is
+# switched on, which keeps a fresh worker's first load fast.
+st.subheader("📸 Scan Barcode / QR Code (optional)")
+camera = None
+if st.toggle("Use camera", key="use_camera"):
+    from streamlit_webrtc import webrtc_streamer
+    from barcode_scanner import ScanPipeline
 
-# Camera section
-st.subheader("📸 Capture Image (optional)")
-webrtc_streamer(key="camera")
+    if "scanner" not in st.session_state:
+        st.session_state.scanner = ScanPipeline()
+    scanner = st.session_state.scanner
+
+    def scan_frame(frame):
+        # Runs on the webrtc media thread; decoding happens in the scanner's pool
+        scanner.submit(frame.to_ndarray(format="bgr24"))
+        return frame
+
+    camera = webrtc_streamer(key="camera", video_frame_callback=scan_frame)
+
+    # A decoded code goes straight into the serial number search
+    scanned = scanner.poll()
+    if scanned:
+        st.session_state.serial_number = scanned[-1]
+
+    # While the camera plays, check for new codes every SCAN_POLL_SECONDS
+    # and rerun the whole app when there is one; widgets (and Stop) keep
+    # working in between
+    @st.fragment(run_every=SCAN_POLL_SECONDS)
+    def watch_scanner():
+        if scanner.has_results():
+            st.rerun()
+
+    if camera.state.playing:
+        watch_scanner()
 
 # Search Section
 st.subheader("🔍 Search Inventory by Serial Number")
-serial_number = st.text_input("Enter Serial Number")
+serial_number = st.text_input("Enter Serial Number", key="serial_number")
 if serial_number:
-    matched_rows = df[df['Serial Number'].astype(str) == serial_number]
+    matched_rows = db.find(serial_number)
     if not matched_rows.empty:
         st.success("Match found:")
         st.dataframe(matched_rows)
     else:
         st.warning("No matching serial number found.")
+        near = fuzzy_match(df, db.key_column, serial_number)
+        if not near.empty:
+            st.info("Did you mean one of these?")
+            st.dataframe(df.loc[near.index].assign(edits=near))
 
 # Manage inventory
 st.subheader("✏️ Add / Update / Confirm Inventory")
@@ -74,25 +147,24 @@ for col in columns:
     user_inputs[col] = st.text_input(f"{col}", value=str(df.at[row_index, col]))
 
 if st.button("Submit Action"):
-    for col, val in user_inputs.items():
-        df.at[row_index, col] = val
-    color_map = {}
     if action in ["Add", "Update"]:
-        color_map[row_index] = "ADD8E6"  # Light Blue
+        color = "ADD8E6"  # Light Blue
     elif action == "Confirm":
-        color_map[row_index] = "90EE90"  # Light Green
-    save_excel(df, color_map)
+        color = "90EE90"  # Light Green
+    db.update_row(row_index, user_inputs, color)
+    df = load_inventory_frame(db.version())
     st.success(f"{action} completed for row {row_index}")
 
+if st.button("💾 Export to Excel File"):
+    save_excel(db)
+    st.success(f"Inventory written to {EXCEL_FILE}")
+
 # Display updated data
 st.subheader("📄 Updated Inventory Preview")
 st.dataframe(df)
 
-buffer = BytesIO()
-df.to_excel(buffer, index=False)
-st.download_button(
-    "📥 Download Updated Excel File",
-    data=buffer.getvalue(),
-    file_name="updated_inventory.xlsx",
-    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-)
+# Built from the store on request; the store's write counter says when it is stale
+st.subheader("📥 Download Updated Inventory")
+download_panel(df, "updated_inventory", "db", version=db.version(), source=db.export_frame, sheet_name=SHEET_NAME)
+
+profiling.panel()
@@ -0,0 +1,64 @@
+from gspread.exceptions import APIError
+from gspread.utils import a1_range_to_grid_range
+
+# In-memory stand-ins for gspread's Spreadsheet/Worksheet: just the calls
+# sheets_client and sheets_queue make, with every call recorded so tests can
+# count API requests.
+
+
+class FakeResponse:
+    def __init__(self, code):
+        self.status_code = code
+        self.text = f"HTTP {code}"
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": self.text, "status": "FAKE"}}
+
+
+def api_error(code):
+    return APIError(FakeResponse(code))
+
+
+class FakeWorksheet:
+    def __init__(self, values, worksheet_id=0):
+        self.id = worksheet_id
+        self.values = [list(row) for row in values]
+        self.calls = []           # (method, args)
+        self.failures = []        # exceptions raised by the next append_rows calls, in order
+        self.updated = 0          # bumped on every change, read by the spreadsheet
+
+    def get_all_values(self):
+        self.calls.append(("get_all_values", ()))
+        return [list(row) for row in self.values]
+
+    def get_values(self, range_name):
+        self.calls.append(("get_values", (range_name,)))
+        grid = a1_range_to_grid_range(range_name)
+        rows = self.values[grid.get("startRowIndex", 0):grid.get("endRowIndex")]
+        return [list(row[grid.get("startColumnIndex", 0):grid.get("endColumnIndex")]) for row in rows]
+
+    def append_rows(self, rows, value_input_option="RAW"):
+        self.calls.append(("append_rows", (rows,)))
+        if self.failures:
+            raise self.failures.pop(0)
+        self.values.extend(["" if v is None else str(v) for v in row] for row in rows)
+        self.updated += 1
+
+    def edit(self, row, col, value):
+        # A change made by someone else, in the sheet's UI
+        self.values[row][col] = value
+        self.updated += 1
+
+    def count(self, method):
+        return sum(1 for name, _ in self.calls if name == method)
+
+
+class FakeSpreadsheet:
+    def __init__(self, values, spreadsheet_id="sheet"):
+        self.id = spreadsheet_id
+        self.sheet1 = FakeWorksheet(values)
+        self.metadata_calls = 0
+
+    def get_lastUpdateTime(self):
+        self.metadata_calls += 1
+        return f"t{self.sheet1.updated}"
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from edit_journal import WorkingCopy
+from inventory_summary import CONFIRMED, NEW, UNMARKED, InventorySummary
+
+
+def pre_marked():
+    # A stock-take saved half way: test_9 marks `confirmed`, test_8 only REMARKS
+    return pd.DataFrame({
+        "Serial Number": ["SN1", "SN2", "SN3", "SN4", "SN5"],
+        "Quantity": [1, 2, 3, 4, 5],
+        "REMARKS": ["Confirmed", "New entry added", "", None, "Confirmed"],
+        "confirmed": ["Y", "B", "", None, None],
+    })
+
+
+def test_counts_start_from_the_saved_marks():
+    summary = InventorySummary(pre_marked())
+    assert (summary.confirmed, summary.new, summary.unmarked) == (2, 1, 2)
+    assert summary.done_fraction() == 3 / 5
+
+
+def test_given_marks_override_the_saved_ones():
+    summary = InventorySummary(pre_marked(), [CONFIRMED, CONFIRMED, NEW, UNMARKED, UNMARKED])
+    assert (summary.confirmed, summary.new, summary.unmarked) == (2, 1, 2)
+
+
+def test_working_copy_confirms_only_count_rows_that_were_unmarked(tmp_path):
+    wc = WorkingCopy(pre_marked(), "digest", journal_dir=str(tmp_path))
+    assert (wc.summary.confirmed, wc.summary.unmarked) == (2, 2)
+    wc.confirm(0)   # already confirmed in the workbook
+    wc.confirm(2)
+    assert (wc.summary.confirmed, wc.summary.new, wc.summary.unmarked) == (3, 1, 1)
+    wc.undo()
+    assert (wc.summary.confirmed, wc.summary.unmarked) == (2, 2)
+    wc.close()
+
+    reopened = WorkingCopy(pre_marked(), "digest", session=wc.session, journal_dir=str(tmp_path))
+    assert (reopened.summary.confirmed, reopened.summary.unmarked) == (2, 2)
+    reopened.close()
@@ -0,0 +1,109 @@
+import pytest
+
+pytest.importorskip("gspread")
+
+import sheets_client
+from fake_gspread import FakeSpreadsheet
+from sheets_client import SheetMirror
+
+VALUES = [["Serial Number", "Quantity"], ["SN001", "3"], ["SN002", ""]]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_mirror(values=VALUES, staleness=30, full_resync=600):
+    spreadsheet = FakeSpreadsheet(values)
+    clock = Clock()
+    return SheetMirror(spreadsheet, staleness=staleness, full_resync=full_resync, clock=clock), spreadsheet, clock
+
+
+def test_first_refresh_reads_the_whole_sheet_once():
+    mirror, spreadsheet, _ = make_mirror()
+    df = mirror.frame()
+    assert df["Serial Number"].tolist() == ["SN001", "SN002"]
+    assert df["Quantity"].tolist() == [3, ""]
+    assert spreadsheet.sheet1.count("get_all_values") == 1
+
+
+def test_reads_inside_the_staleness_window_make_no_calls():
+    mirror, spreadsheet, clock = make_mirror()
+    mirror.frame()
+    calls, metadata = len(spreadsheet.sheet1.calls), spreadsheet.metadata_calls
+    for _ in range(5):
+        clock.now += 5
+        mirror.frame()
+    assert len(spreadsheet.sheet1.calls) == calls
+    assert spreadsheet.metadata_calls == metadata
+
+
+def test_unchanged_sheet_costs_one_metadata_call():
+    mirror, spreadsheet, clock = make_mirror()
+    mirror.frame()
+    clock.now += 31
+    mirror.frame()
+    assert spreadsheet.metadata_calls == 2
+    assert spreadsheet.sheet1.count("get_all_values") == 1
+    assert spreadsheet.sheet1.count("get_values") == 0
+
+
+def test_appended_rows_are_read_as_a_tail_range():
+    mirror, spreadsheet, clock = make_mirror()
+    mirror.frame()
+    spreadsheet.sheet1.append_rows([["SN003", "7"], ["SN004", "1"]])
+    clock.now += 31
+    df = mirror.frame()
+    assert df["Serial Number"].tolist() == ["SN001", "SN002", "SN003", "SN004"]
+    assert spreadsheet.sheet1.count("get_all_values") == 1
+    assert spreadsheet.sheet1.calls[-1] == ("get_values", ("A4:B",))
+
+
+def test_edited_rows_force_a_full_download():
+    mirror, spreadsheet, clock = make_mirror()
+    mirror.frame()
+    spreadsheet.sheet1.edit(1, 1, "9")
+    clock.now += 31
+    assert mirror.frame()["Quantity"].tolist() == [9, ""]
+    assert spreadsheet.sheet1.count("get_all_values") == 2
+
+
+def test_full_resync_interval():
+    mirror, spreadsheet, clock = make_mirror(staleness=30, full_resync=100)
+    mirror.frame()
+    clock.now += 101
+    mirror.frame()
+    assert spreadsheet.sheet1.count("get_all_values") == 2
+
+
+def test_own_appends_do_not_trigger_a_download():
+    mirror, spreadsheet, clock = make_mirror()
+    mirror.frame()
+    rows = [["SN003", 5]]
+    spreadsheet.sheet1.append_rows(rows)
+    mirror.appended(rows)
+    clock.now += 31
+    df = mirror.frame()
+    assert df["Serial Number"].tolist() == ["SN001", "SN002", "SN003"]
+    assert spreadsheet.sheet1.count("get_all_values") == 1
+    assert spreadsheet.sheet1.count("get_values") == 0
+
+
+def test_client_and_mirror_are_shared(monkeypatch):
+    opened = []
+
+    class FakeClient:
+        def open_by_url(self, url):
+            opened.append(url)
+            return FakeSpreadsheet(VALUES)
+
+    monkeypatch.setattr(sheets_client, "_clients", {"creds.json": FakeClient()})
+    monkeypatch.setattr(sheets_client, "_mirrors", {})
+    first = sheets_client.get_sheet_mirror("https://sheet", "creds.json")
+    second = sheets_client.get_sheet_mirror("https://sheet", "creds.json")
+    assert first is second
+    assert opened == ["https://sheet"]
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+pytest.importorskip("gspread")
+
+from fake_gspread import FakeWorksheet, api_error
+from sheets_queue import AppendQueue
+
+HEADER = [["Serial Number", "Quantity"]]
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / "queue.jsonl")
+
+
+def make_queue(journal, worksheet=None, **kwargs):
+    worksheet = worksheet or FakeWorksheet(HEADER)
+    sleeps = []
+    kwargs.setdefault("flush_interval", 0.05)
+    queue = AppendQueue(worksheet, journal, sleep=sleeps.append, **kwargs)
+    return queue, worksheet, sleeps
+
+
+def test_a_burst_of_rows_is_sent_as_one_request(journal):
+    flushed = []
+    queue, worksheet, _ = make_queue(journal, flush_interval=5.0, on_flushed=flushed.append)
+    for i in range(5):
+        queue.put([f"SN{i:03d}", i])
+    assert queue.flush(timeout=5)
+    queue.close()
+    assert worksheet.count("append_rows") == 1
+    assert worksheet.values[1:] == [[f"SN{i:03d}", str(i)] for i in range(5)]
+    assert flushed == [[[f"SN{i:03d}", i] for i in range(5)]]
+    assert queue.sent == 5
+
+
+def test_batches_are_capped_at_batch_size(journal):
+    queue, worksheet, _ = make_queue(journal, batch_size=2, flush_interval=5.0)
+    for i in range(5):
+        queue.put([f"SN{i:03d}", i])
+    assert queue.flush(timeout=5)
+    queue.close()
+    sizes = [len(args[0]) for name, args in worksheet.calls if name == "append_rows"]
+    assert sizes == [2, 2, 1]
+    assert len(worksheet.values) == 6
+
+
+def test_quota_errors_are_retried_with_backoff(journal):
+    worksheet = FakeWorksheet(HEADER)
+    worksheet.failures = [api_error(429), api_error(503)]
+    queue, worksheet, sleeps = make_queue(journal, worksheet)
+    queue.put(["SN001", 1])
+    assert queue.flush(timeout=5)
+    queue.close()
+    assert worksheet.count("append_rows") == 3
+    assert worksheet.values[1:] == [["SN001", "1"]]
+    assert len(sleeps) == 2 and sleeps[1] > sleeps[0]
+    assert queue.last_error is None
+
+
+def test_rejected_rows_are_parked_not_retried(journal):
+    worksheet = FakeWorksheet(HEADER)
+    worksheet.failures = [api_error(400)]
+    queue, worksheet, sleeps = make_queue(journal, worksheet)
+    queue.put(["SN001", 1])
+    assert queue.flush(timeout=5)
+    queue.close()
+    assert worksheet.count("append_rows") == 1
+    assert sleeps == []
+    with open(journal + ".failed", encoding="utf-8") as f:
+        parked = [json.loads(line) for line in f]
+    assert [entry["row"] for entry in parked] == [["SN001", 1]]
+
+
+def test_unsent_rows_are_resent_after_a_restart(journal):
+    with open(journal, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"id": 0, "row": ["SN001", 1]}) + "\n")
+        f.write(json.dumps({"id": 1, "row": ["SN002", 2]}) + "\n")
+        f.write(json.dumps({"ack": [0]}) + "\n")
+        f.write('{"id": 2, "ro')  # torn write from a crash
+    queue, worksheet, _ = make_queue(journal)
+    assert queue.flush(timeout=5)
+    queue.close()
+    assert worksheet.values[1:] == [["SN002", "2"]]
+    with open(journal, encoding="utf-8") as f:
+        assert f.read() == ""  # everything sent, journal started over
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("xlsxwriter")
+
+from excel_export import BLUE, GREEN, build_final_excel
+from snapshot_diff import STATUS, diff_snapshots, read_highlights
+
+
+def inventory(n=6):
+    return pd.DataFrame({"Serial Number": [f"SN{i:03d}" for i in range(n)], "Quantity": np.arange(n)})
+
+
+def test_read_highlights_finds_the_final_sheets_row_colours():
+    df = inventory()
+    final = build_final_excel(df, green=[1, 2], blue=[4], red_cells={(3, "Quantity"): True})
+    assert read_highlights(final, len(df)).tolist() == ["", GREEN, GREEN, "", BLUE, ""]
+
+
+def test_rows_confirmed_only_by_colour_are_status_changes():
+    master = inventory()
+    final = build_final_excel(master, green=[2])
+    diff = diff_snapshots(master, master.copy(), "Serial Number", None, read_highlights(final, len(master)))
+    assert diff.status_changed.tolist() == [2]
+    assert diff.changes()["Change"].tolist() == [STATUS]
+
+
+def test_without_colours_only_status_columns_count():
+    master = inventory()
+    assert diff_snapshots(master, master.copy(), "Serial Number").summary()["status_changed"] == 0
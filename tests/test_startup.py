@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+from bench_startup import BUDGET_MS, check_app
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_test_poop_imports_within_budget():
+    result = check_app(os.path.join(ROOT, "test_poop.py"), repeat=3, cwd=ROOT)
+    assert result["seconds"] * 1000 <= BUDGET_MS, result["imports"][:8]
+
+
+def test_test_poop_leaves_camera_excel_and_sheets_unloaded():
+    result = check_app(os.path.join(ROOT, "test_poop.py"), repeat=1, cwd=ROOT)
+    assert not {"cv2", "streamlit_webrtc", "openpyxl", "gspread"} & set(result["loaded"])
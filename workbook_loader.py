@@ -0,0 +1,171 @@
+import atexit
+import hashlib
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import pandas as pd
+
+from excel_cache import cache_frame, cached_frame, file_bytes, file_digest, parse_sheet, shared_inventory
+from inventory_dtypes import normalise_frame
+from profiling import traced
+
+# --- Config ---
+SOURCE_COLUMN = "Source File"
+SHEET_COLUMN = "Sheet"
+WORKERS = os.cpu_count() or 1
+CONSOLIDATED = "consolidated"  # cache "sheet name" for merged frames
+
+# Different spellings of the same column across sites' workbooks
+COLUMN_ALIASES = {
+    "serial": "serial number",
+    "serial no": "serial number",
+    "serial no.": "serial number",
+    "serial #": "serial number",
+    "s/n": "serial number",
+    "sn": "serial number",
+    "qty": "quantity",
+    "remark": "remarks",
+    "name": "product name",
+    "product": "product name",
+}
+# Names the apps look for; other columns keep their first spelling
+CANONICAL_NAMES = {
+    "serial number": "Serial Number",
+    "product name": "Product Name",
+    "quantity": "Quantity",
+    "status": "Status",
+    "remarks": "REMARKS",
+    "confirmed": "confirmed",
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+_sheet_names = {}  # digest -> sheet names, so cache hits skip opening the workbook
+
+
+def _get_pool():
+    # One pool for the whole process; workers are spawned (not forked), as
+    # forking a process running Streamlit's threads can deadlock.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def sheet_names(data, digest=None):
+    digest = digest or file_digest(data)
+    names = _sheet_names.get(digest)
+    if names is None:
+        from openpyxl import load_workbook
+
+        wb = load_workbook(BytesIO(data), read_only=True)
+        try:
+            names = _sheet_names[digest] = list(wb.sheetnames)
+        finally:
+            wb.close()
+    return names
+
+
+def column_key(name):
+    key = re.sub(r"[\s_]+", " ", str(name)).strip().lower()
+    return COLUMN_ALIASES.get(key, key)
+
+
+def harmonise_columns(frames):
+    # Rename columns that only differ in case, spacing or a known alias to
+    # one name, so the sheets line up when concatenated.
+    names = {}
+    for df in frames:
+        for col in df.columns:
+            key = column_key(col)
+            names.setdefault(key, CANONICAL_NAMES.get(key, str(col).strip()))
+    out = []
+    for df in frames:
+        mapping = {col: names[column_key(col)] for col in df.columns}
+        if len(set(mapping.values())) < len(mapping):
+            # Two columns of one sheet map to the same name; leave that sheet's
+            # headers alone rather than merge its columns
+            mapping = {}
+        out.append(df.rename(columns=mapping))
+    return out
+
+
+def _sources(uploaded_files):
+    # [(name, data, digest, [sheet names])]
+    sources = []
+    for i, uploaded_file in enumerate(uploaded_files):
+        data = file_bytes(uploaded_file)
+        digest = file_digest(data)
+        name = getattr(uploaded_file, "name", None)
+        if name is None:
+            name = uploaded_file if isinstance(uploaded_file, str) else f"file {i + 1}"
+        sources.append((os.path.basename(name), data, digest, sheet_names(data, digest)))
+    return sources
+
+
+def _parse_sheets(tasks, workers):
+    # {(digest, sheet): frame} for sheets not in the cache; parsed in parallel
+    frames = {}
+    missing = []
+    for data, digest, sheet in tasks:
+        df = cached_frame(digest, sheet)
+        if df is None:
+            missing.append((data, digest, sheet))
+        else:
+            frames[(digest, sheet)] = df
+    if len(missing) == 1 or workers == 1:
+        results = (parse_sheet(data, sheet) for data, _, sheet in missing)
+    else:
+        pool = _get_pool()
+        results = pool.map(parse_sheet, [data for data, _, _ in missing], [sheet for _, _, sheet in missing])
+    for (_, digest, sheet), df in zip(missing, results):
+        cache_frame(digest, df, sheet)
+        frames[(digest, sheet)] = df
+    return frames
+
+
+def _consolidate(sources, frames):
+    parts = []
+    for name, _, digest, sheets in sources:
+        for sheet in sheets:
+            part = frames[(digest, sheet)]
+            if not part.empty:
+                parts.append(part.assign(**{SOURCE_COLUMN: name, SHEET_COLUMN: sheet}))
+    if not parts:
+        return pd.DataFrame()
+    df = pd.concat(harmonise_columns(parts), ignore_index=True)
+    # Per-sheet categories don't survive concat; compact the merged frame
+    return normalise_frame(df)
+
+
+@traced("load_workbooks")
+def load_workbooks(uploaded_files, workers=WORKERS):
+    # Every sheet of every workbook in one frame, tagged with SOURCE_COLUMN and
+    # SHEET_COLUMN. A single single-sheet workbook loads as-is (no tags), the
+    # same frame load_inventory would give.
+    sources = _sources(uploaded_files)
+    tasks = [(data, digest, sheet) for _, data, digest, sheets in sources for sheet in sheets]
+    combined = hashlib.sha256("|".join(f"{digest}:{sheet}" for _, digest, sheet in tasks).encode()).hexdigest()
+
+    if len(tasks) == 1:
+        _, digest, sheet = tasks[0]
+        df = shared_inventory(digest, sheet, lambda: _parse_sheets(tasks, workers)[(digest, sheet)])
+        combined = digest
+    else:
+        def consolidate():
+            merged = cached_frame(combined, CONSOLIDATED)
+            if merged is None:
+                merged = _consolidate(sources, _parse_sheets(tasks, workers))
+                cache_frame(combined, merged, CONSOLIDATED)
+            return merged
+
+        df = shared_inventory(combined, CONSOLIDATED, consolidate)
+
+    df.attrs["digest"] = combined
+    return df